@@ -1,34 +1,40 @@
-from flask import Flask, render_template, request
+import copy
+import hashlib
+import re
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date
+from itertools import accumulate
+
+from flask import Flask, render_template, request, stream_template
+from jinja2 import FileSystemBytecodeCache
 from validador_cnab import (
     detectar_layout,
-    validar_tamanho_linhas,
     identificar_banco,
-    validar_estrutura_basica_cnab240,
-    validar_codigo_banco_consistente,
-    validar_lotes_cnab240,
-    validar_sequencia_registros_lote,
+    validar_registros_cnab240,
     validar_segmentos_por_layout,
     validar_dados_cedente_vs_arquivo,
     validar_linha_digitavel_boleto,
     gerar_resumo_remessa_cnab240,
+    indexar_segmentos_p_cnab240,
     listar_titulos_cnab240,
     validar_segmentos_avancados_bb,
-    validar_qtd_registros_lote_cnab240,
-    validar_totais_arquivo_cnab240,
     validar_convenio_carteira_nosso_numero_bb,
     detectar_cnab240_itau_sisdeb,
     validar_cnab240_itau_sisdeb,
     validar_cnab240_sicredi,
-    validar_cnab400_bb,
-    validar_cnab400_brb,
-    validar_cnab400_banestes,
-    validar_cnab400_itau,
-    validar_cnab400_sicredi,
-    validar_cnab400_caixa,
-    validar_cnab400_bradesco,
-    validar_cnab400_santander,
+    selecionar_validador_cnab400,
 )
 
+# Validações extras de segmentos CNAB 240 por banco, somadas (em ordem) às do
+# layout cadastrado: regras avançadas do BB (modo permissivo) e de convênio /
+# carteira / Nosso Número.
+VALIDADORES_SEGMENTOS_EXTRAS_CNAB240 = {
+    "001": (validar_segmentos_avancados_bb, validar_convenio_carteira_nosso_numero_bb),
+}
+
 
 def validar_nosso_numero_duplicado_titulos(titulos):
     """
@@ -36,34 +42,37 @@ def validar_nosso_numero_duplicado_titulos(titulos):
     (resultado de listar_titulos_cnab240).
     Retorna uma lista de avisos em texto.
     """
-    avisos = []
-    vistos = {}  # chave = Nosso Número, valor = primeiro título onde apareceu
+    duplicados = []  # (nn, lote1, seq1, lote2, seq2) de cada repetição encontrada
+    vistos = {}  # chave = Nosso Número, valor = (lote, sequência) do primeiro título onde apareceu
 
     for t in titulos:
         nn = (t.get("nosso_numero") or "").strip()
         if not nn:
             continue
 
-        chave = nn
-
-        if chave in vistos:
-            primeiro = vistos[chave]
-            avisos.append(
-                (
-                    "Títulos com o mesmo Nosso Número '{nn}': primeiro em "
-                    "Lote {lote1}, Seq {seq1}; depois em Lote {lote2}, Seq {seq2}."
-                ).format(
-                    nn=nn,
-                    lote1=primeiro.get("lote"),
-                    seq1=primeiro.get("sequencia"),
-                    lote2=t.get("lote"),
-                    seq2=t.get("sequencia"),
-                )
-            )
+        primeiro = vistos.get(nn)
+        if primeiro is None:
+            vistos[nn] = (t.get("lote"), t.get("sequencia"))
         else:
-            vistos[chave] = t
-
-    return avisos
+            duplicados.append((nn, *primeiro, t.get("lote"), t.get("sequencia")))
+
+    return [
+        f"Títulos com o mesmo Nosso Número '{nn}': primeiro em "
+        f"Lote {lote1}, Seq {seq1}; depois em Lote {lote2}, Seq {seq2}."
+        for nn, lote1, seq1, lote2, seq2 in duplicados
+    ]
+
+
+# Termos que classificam cada aviso. Um mesmo aviso pode citar mais de um
+# grupo (ex.: "Seg. P" e "Convênio"); vale a ordem de prioridade abaixo.
+_PADRAO_GRUPO_AVISO = re.compile(
+    r"(?P<p>segmento p|seg\. p)"
+    r"|(?P<q>segmento q|seg\. q)"
+    r"|(?P<r>segmento r|seg\. r)"
+    r"|(?P<conv>convênio|convenio|carteira|nosso número|nosso numero)",
+    re.IGNORECASE,
+)
+_PRIORIDADE_GRUPO_AVISO = {"p": 0, "q": 1, "r": 2, "conv": 3, "outros": 4}
 
 
 def agrupar_avisos_segmentos(avisos):
@@ -83,35 +92,168 @@ def agrupar_avisos_segmentos(avisos):
         "outros": [],
     }
 
-    for msg in avisos:
-        m = msg.lower()
+    # Uma única varredura do regex sobre todos os avisos unidos por "\n" (nenhum
+    # termo do padrão contém "\n", então um casamento nunca atravessa dois avisos);
+    # a posição do casamento diz a qual aviso ele pertence.
+    inicios = list(accumulate((len(msg) + 1 for msg in avisos), initial=0))
+    classes = ["outros"] * len(avisos)
+    for m in _PADRAO_GRUPO_AVISO.finditer("\n".join(avisos)):
+        indice = bisect_right(inicios, m.start()) - 1
+        if _PRIORIDADE_GRUPO_AVISO[m.lastgroup] < _PRIORIDADE_GRUPO_AVISO[classes[indice]]:
+            classes[indice] = m.lastgroup
 
-        if "segmento p" in m or "seg. p" in m:
-            grupos["p"].append(msg)
+    for msg, grupo in zip(avisos, classes):
+        grupos[grupo].append(msg)
 
-        elif "segmento q" in m or "seg. q" in m:
-            grupos["q"].append(msg)
+    return grupos
 
-        elif "segmento r" in m or "seg. r" in m:
-            grupos["r"].append(msg)
 
-        elif (
-            "convênio" in m
-            or "convenio" in m
-            or "carteira" in m
-            or "nosso número" in m
-            or "nosso numero" in m
-        ):
-            grupos["conv"].append(msg)
+# Caracteres que str.splitlines() trata como fim de linha no intervalo latin-1
+_TERMINADORES_LATIN1 = "\n\r\x0b\x0c\x1c\x1d\x1e\x85"
+
+
+@dataclass(slots=True)
+class ResultadoRemessa:
+    """
+    Resultado da validação de uma remessa, no formato esperado pelo template
+    resultado.html (que acessa os campos como atributos).
+    """
+
+    layout: object = None  # 240, 400 ou o conjunto de tamanhos encontrados
+    codigo_banco: str = None
+    nome_banco: str = None
+    erros_tamanho: list = field(default_factory=list)
+    erros_estrutura: list = field(default_factory=list)
+    erros_banco: list = field(default_factory=list)
+    erros_lotes: list = field(default_factory=list)
+    erros_sequencia: list = field(default_factory=list)
+    erros_segmentos: list = field(default_factory=list)
+    avisos_segmentos: list = field(default_factory=list)
+    avisos_segmentos_p: list = field(default_factory=list)
+    avisos_segmentos_q: list = field(default_factory=list)
+    avisos_segmentos_r: list = field(default_factory=list)
+    avisos_segmentos_convenio: list = field(default_factory=list)
+    avisos_segmentos_outros: list = field(default_factory=list)
+    erros_dados_conta: list = field(default_factory=list)
+    avisos_dados_conta: list = field(default_factory=list)
+    resumo_remessa: dict = None
+    titulos: list = field(default_factory=list)
+    cnab240_itau_sisdeb: bool = False
+    cnab240_sicredi: bool = False
+    itau_sisdeb_erros_header: list = field(default_factory=list)
+    itau_sisdeb_erros_lotes: list = field(default_factory=list)
+    itau_sisdeb_erros_detalhes: list = field(default_factory=list)
+    itau_sisdeb_erros_trailer: list = field(default_factory=list)
+    itau_sisdeb_avisos: list = field(default_factory=list)
+    cnab400_erros_header: list = field(default_factory=list)
+    cnab400_erros_registros: list = field(default_factory=list)
+    cnab400_erros_trailer: list = field(default_factory=list)
+    cnab400_avisos: list = field(default_factory=list)
+    resumo_cnab400: dict = None
+    cnab400_header_info: dict = None
+
+
+def _iter_linhas(stream, chunk=65536, hasher=None):
+    """
+    Lê o arquivo enviado em blocos de tamanho fixo e devolve as linhas já
+    decodificadas em latin-1 (sem os terminadores), uma a uma.
+
+    Equivale a ``stream.read().decode("latin-1").splitlines()``, mas sem manter
+    o conteúdo inteiro em memória como bytes e como str ao mesmo tempo.
+    Cada bloco é decodificado e quebrado em linhas uma única vez; só a linha
+    incompleta do fim do bloco fica pendente até o próximo (inclusive um
+    "\r" que pode ser a primeira metade de um "\r\n").
 
+    Se ``hasher`` for informado (ex.: ``hashlib.blake2b()``), cada bloco lido
+    também é repassado a ele, sem precisar de outra passada sobre o arquivo.
+    """
+    buffer = bytearray(chunk)
+    view = memoryview(buffer)
+    pendente = ""
+
+    while True:
+        lidos = stream.readinto(buffer)
+        if not lidos:
+            break
+        if hasher is not None:
+            hasher.update(view[:lidos])
+
+        # Decodifica direto do buffer (sem a cópia intermediária em bytes)
+        texto = pendente + str(view[:lidos], "latin-1")
+        linhas = texto.splitlines()
+        fim = texto[-1]
+        if fim == "\r":
+            # Pode ser a primeira metade de um "\r\n": decide no próximo bloco
+            pendente = linhas.pop() + "\r"
+        elif fim in _TERMINADORES_LATIN1:
+            pendente = ""
         else:
-            grupos["outros"].append(msg)
+            pendente = linhas.pop()
+        yield from linhas
+
+    if pendente:
+        yield from pendente.splitlines()
 
-    return grupos
 
+# Cache dos resultados por conteúdo do arquivo: reenviar a mesma remessa
+# (caso comum durante testes) não executa de novo todas as validações.
+# O tamanho é limitado pelo total de linhas das remessas guardadas (o resultado
+# cresce com o arquivo: títulos, avisos...); remessas maiores que o limite
+# inteiro não entram no cache.
+_CACHE_RESULTADOS_MAX = 32
+_CACHE_RESULTADOS_MAX_LINHAS = 20000
+_cache_resultados = OrderedDict()  # chave -> (resultado, qtd. de linhas)
+_cache_resultados_linhas = 0
+_cache_resultados_lock = threading.Lock()
+
+
+def _obter_resultado_cache(chave):
+    """
+    Cópia do resultado guardado para ``chave`` (ou None): quem recebe pode
+    alterá-lo à vontade sem afetar o que está no cache.
+    """
+    with _cache_resultados_lock:
+        item = _cache_resultados.get(chave)
+        if item is None:
+            return None
+        _cache_resultados.move_to_end(chave)
+    return copy.deepcopy(item[0])
+
+
+def _guardar_resultado_cache(chave, resultado, qtd_linhas):
+    """
+    Guarda uma cópia de ``resultado`` (o original segue para a resposta),
+    descartando os mais antigos para respeitar os limites do cache.
+    """
+    global _cache_resultados_linhas
+    if qtd_linhas > _CACHE_RESULTADOS_MAX_LINHAS:
+        return
+    copia = copy.deepcopy(resultado)
+    with _cache_resultados_lock:
+        anterior = _cache_resultados.pop(chave, None)
+        if anterior is not None:
+            _cache_resultados_linhas -= anterior[1]
+        _cache_resultados[chave] = (copia, qtd_linhas)
+        _cache_resultados_linhas += qtd_linhas
+        while (
+            len(_cache_resultados) > _CACHE_RESULTADOS_MAX
+            or _cache_resultados_linhas > _CACHE_RESULTADOS_MAX_LINHAS
+        ):
+            _, (_, linhas_removidas) = _cache_resultados.popitem(last=False)
+            _cache_resultados_linhas -= linhas_removidas
+
+
+def _limpar_cache_resultados():
+    global _cache_resultados_linhas
+    with _cache_resultados_lock:
+        _cache_resultados.clear()
+        _cache_resultados_linhas = 0
 
 
 app = Flask(__name__)
+# Guarda os templates já compilados em disco (diretório temporário do usuário),
+# para que novos workers do gunicorn não precisem recompilar resultado.html.
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
 
 
 @app.route("/")
@@ -123,190 +265,105 @@ def index():
     return render_template("index.html")
 
 
-@app.route("/validar", methods=["POST"])
-def validar():
+def _analisar_remessa(linhas):
     """
-    Recebe o arquivo de remessa + dados da conta/titular,
-    executa as validações usando o motor do validador_cnab.py
-    e devolve os resultados para a página resultado.html.
+    Executa todas as validações que dependem apenas do conteúdo do arquivo
+    e devolve o dicionário de resultado usado pelo template resultado.html
+    (sem a conferência dos dados da conta/titular).
     """
-    arquivo = request.files.get("arquivo")
-    if not arquivo:
-        return "Nenhum arquivo enviado.", 400
-
-    # Lê conteúdo do arquivo em memória
-    conteudo = arquivo.read().decode("latin-1", errors="ignore")
-    linhas = conteudo.splitlines()
-
-    # Dados da conta/titular digitados pelo usuário
-    dados_conta = {
-        "banco": (request.form.get("banco") or "").strip(),
-        "agencia": (request.form.get("agencia") or "").strip(),
-        "conta": (request.form.get("conta") or "").strip(),
-        "documento": (request.form.get("documento") or "").strip(),
-        "nome": (request.form.get("nome") or "").strip(),
-    }
-
     # Estrutura padrão do resultado que será enviada ao template
-    resultado = {
-        "layout": None,
-        "codigo_banco": None,
-        "nome_banco": None,
-        "erros_tamanho": [],
-        "erros_estrutura": [],
-        "erros_banco": [],
-        "erros_lotes": [],
-        "erros_sequencia": [],
-        "erros_segmentos": [],
-        "avisos_segmentos": [],
-        "avisos_segmentos_p": [],
-        "avisos_segmentos_q": [],
-        "avisos_segmentos_r": [],
-        "avisos_segmentos_convenio": [],
-        "avisos_segmentos_outros": [],
-        "erros_dados_conta": [],
-        "avisos_dados_conta": [],
-        "resumo_remessa": None,
-        "titulos": [],
-        "cnab240_itau_sisdeb": False,
-        "cnab240_sicredi": False,
-        "itau_sisdeb_erros_header": [],
-        "itau_sisdeb_erros_lotes": [],
-        "itau_sisdeb_erros_detalhes": [],
-        "itau_sisdeb_erros_trailer": [],
-        "itau_sisdeb_avisos": [],
-        "cnab400_erros_header": [],
-        "cnab400_erros_registros": [],
-        "cnab400_erros_trailer": [],
-        "cnab400_avisos": [],
-        "resumo_cnab400": None,
-        "cnab400_header_info": None,
-    }
+    resultado = ResultadoRemessa()
 
     # 1) Detecta layout do arquivo (240 ou 400)
     layout = detectar_layout(linhas)
-    resultado["layout"] = layout
+    resultado.layout = layout
 
     # Se detectar um conjunto de tamanhos (layout inconsistente)
     if isinstance(layout, set):
-        resultado["erros_tamanho"].append(
+        resultado.erros_tamanho.append(
             f"Não foi possível identificar um layout único (240 ou 400). "
             f"Tamanhos de linha encontrados: {layout}."
         )
-        return render_template("resultado.html", resultado=resultado, dados_conta=dados_conta)
+        return resultado
 
-    # 2) Validação de tamanho de linhas
-    resultado["erros_tamanho"] = validar_tamanho_linhas(linhas, layout)
+    # 2) Tamanho de linhas: detectar_layout só devolve 240/400 quando todas as
+    # linhas não vazias têm esse tamanho, então não há erros de tamanho a
+    # procurar (validar_tamanho_linhas usa o mesmo critério). Arquivos com
+    # tamanhos misturados já saíram acima, sem rodar o restante das validações.
 
     # 3) Validações específicas para CNAB 240
     if layout == 240 and linhas:
         # Banco (código e nome) a partir do header de arquivo
         codigo_banco, nome_banco = identificar_banco(linhas[0])
-        resultado["codigo_banco"] = codigo_banco
-        resultado["nome_banco"] = nome_banco
+        resultado.codigo_banco = codigo_banco
+        resultado.nome_banco = nome_banco
 
         itau_sisdeb = codigo_banco == "341" and detectar_cnab240_itau_sisdeb(linhas)
-        resultado["cnab240_itau_sisdeb"] = itau_sisdeb
-        sicredi_layout = codigo_banco == "748"
-        resultado["cnab240_sicredi"] = sicredi_layout
+        resultado.cnab240_itau_sisdeb = itau_sisdeb
+        resultado.cnab240_sicredi = codigo_banco == "748"
+
+        # Estrutura, banco, lotes, totais e sequência rodam juntas numa única passada
+        erros_registros = validar_registros_cnab240(linhas, codigo_banco)
 
         # Estrutura básica (header/trailer/tipos de registro) + totais do arquivo
-        erros_estrutura_basica = validar_estrutura_basica_cnab240(linhas)
-        erros_totais_arquivo = validar_totais_arquivo_cnab240(linhas)
-        resultado["erros_estrutura"] = erros_estrutura_basica + erros_totais_arquivo
+        # (as listas devolvidas são novas a cada chamada: estende em vez de concatenar)
+        resultado.erros_estrutura = erros_registros["estrutura"]
+        resultado.erros_estrutura.extend(erros_registros["totais"])
 
         # Consistência do código do banco em todas as linhas
-        resultado["erros_banco"] = validar_codigo_banco_consistente(linhas, codigo_banco)
+        resultado.erros_banco = erros_registros["banco"]
 
         # Estrutura de lotes: validação básica + validação avançada (qtd de registros)
-        erros_lotes_basicos = validar_lotes_cnab240(linhas)
-        erros_lotes_qtd = validar_qtd_registros_lote_cnab240(linhas)
-        resultado["erros_lotes"] = erros_lotes_basicos + erros_lotes_qtd
+        resultado.erros_lotes = erros_registros["lotes"]
+        resultado.erros_lotes.extend(erros_registros["lotes_qtd"])
 
         # Sequência de registros dentro dos lotes
-        resultado["erros_sequencia"] = validar_sequencia_registros_lote(linhas)
+        resultado.erros_sequencia = erros_registros["sequencia"]
 
         if not itau_sisdeb:
             # Validações de segmentos P/Q/etc. conforme layout cadastrado
             erros_seg, avisos_seg = validar_segmentos_por_layout(codigo_banco, linhas)
 
-            # Validações avançadas (modo permissivo) específicas do Banco do Brasil (001)
-            if codigo_banco == "001":
-                # 1) Regras avançadas de Segmentos (P, Q, etc.) que você já tinha
-                erros_extra, avisos_extra = validar_segmentos_avancados_bb(linhas)
+            # Validações de segmentos específicas do banco (ex.: regras avançadas do BB)
+            for validador_extra in VALIDADORES_SEGMENTOS_EXTRAS_CNAB240.get(codigo_banco, ()):
+                erros_extra, avisos_extra = validador_extra(linhas)
                 erros_seg.extend(erros_extra)
                 avisos_seg.extend(avisos_extra)
 
-                # 2) Regras de convênio / carteira / Nosso Número (novas)
-                erros_conv, avisos_conv = validar_convenio_carteira_nosso_numero_bb(linhas)
-                erros_seg.extend(erros_conv)
-                avisos_seg.extend(avisos_conv)
-
-            resultado["erros_segmentos"] = erros_seg
-            resultado["avisos_segmentos"] = avisos_seg
+            resultado.erros_segmentos = erros_seg
+            resultado.avisos_segmentos = avisos_seg
 
             # Agrupar avisos de segmentos por tipo (P, Q, R, convênio/carteira/NN, outros)
             grupos = agrupar_avisos_segmentos(avisos_seg)
-            resultado["avisos_segmentos_p"] = grupos["p"]
-            resultado["avisos_segmentos_q"] = grupos["q"]
-            resultado["avisos_segmentos_r"] = grupos["r"]
-            resultado["avisos_segmentos_convenio"] = grupos["conv"]
-            resultado["avisos_segmentos_outros"] = grupos["outros"]
+            resultado.avisos_segmentos_p = grupos["p"]
+            resultado.avisos_segmentos_q = grupos["q"]
+            resultado.avisos_segmentos_r = grupos["r"]
+            resultado.avisos_segmentos_convenio = grupos["conv"]
+            resultado.avisos_segmentos_outros = grupos["outros"]
         else:
             analise_itau = validar_cnab240_itau_sisdeb(linhas)
-            resultado["itau_sisdeb_erros_header"] = analise_itau["erros_header"]
-            resultado["itau_sisdeb_erros_lotes"] = analise_itau["erros_lotes"]
-            resultado["itau_sisdeb_erros_detalhes"] = analise_itau["erros_detalhes"]
-            resultado["itau_sisdeb_erros_trailer"] = analise_itau["erros_trailer"]
-            resultado["itau_sisdeb_avisos"] = analise_itau["avisos"]
-            resultado["titulos"] = analise_itau["titulos"]
-            resultado["resumo_remessa"] = analise_itau["resumo"]
+            resultado.itau_sisdeb_erros_header = analise_itau["erros_header"]
+            resultado.itau_sisdeb_erros_lotes = analise_itau["erros_lotes"]
+            resultado.itau_sisdeb_erros_detalhes = analise_itau["erros_detalhes"]
+            resultado.itau_sisdeb_erros_trailer = analise_itau["erros_trailer"]
+            resultado.itau_sisdeb_avisos = analise_itau["avisos"]
+            resultado.titulos = analise_itau["titulos"]
+            resultado.resumo_remessa = analise_itau["resumo"]
 
 
-        # Conferência dos dados da conta/titular informados x dados do arquivo
-        erros_dados, avisos_dados = validar_dados_cedente_vs_arquivo(
-            codigo_banco, linhas, dados_conta, layout=240
-        )
-        resultado["erros_dados_conta"] = erros_dados
-        resultado["avisos_dados_conta"] = avisos_dados
-
         if not itau_sisdeb:
+            # As linhas de Segmento P são localizadas uma vez para o resumo e a lista
+            indices_p = indexar_segmentos_p_cnab240(linhas)
+
             # Resumo da remessa (qtd de títulos, valor total, vencimentos)
-            resumo = gerar_resumo_remessa_cnab240(codigo_banco, linhas)
-            resultado["resumo_remessa"] = resumo
+            resultado.resumo_remessa = gerar_resumo_remessa_cnab240(codigo_banco, linhas, indices_p)
 
             # Lista detalhada de títulos (Segmentos P + Q)
-            titulos = listar_titulos_cnab240(codigo_banco, linhas)
-            resultado["titulos"] = titulos
-
-            # Validação avançada: detectar títulos com Nosso Número duplicado (BB)
-            if codigo_banco == "001" and resultado["titulos"]:
-                avisos_nn_dup = validar_nosso_numero_duplicado_titulos(resultado["titulos"])
-                if avisos_nn_dup:
-                    resultado["avisos_segmentos"].extend(avisos_nn_dup)
-
-                    # reagrupa
-                    grupos = agrupar_avisos_segmentos(resultado["avisos_segmentos"])
-                    resultado["avisos_segmentos_p"] = grupos["p"]
-                    resultado["avisos_segmentos_q"] = grupos["q"]
-                    resultado["avisos_segmentos_r"] = grupos["r"]
-                    resultado["avisos_segmentos_convenio"] = grupos["conv"]
-                    resultado["avisos_segmentos_outros"] = grupos["outros"]
-
-        if sicredi_layout:
-            analise_sicredi = validar_cnab240_sicredi(linhas)
-            if analise_sicredi["erros_header"]:
-                resultado["erros_estrutura"].extend(analise_sicredi["erros_header"])
-            if analise_sicredi["erros_segmentos"]:
-                resultado["erros_segmentos"].extend(analise_sicredi["erros_segmentos"])
-            if analise_sicredi["avisos"]:
-                resultado["avisos_segmentos"].extend(analise_sicredi["avisos"])
-                grupos = agrupar_avisos_segmentos(resultado["avisos_segmentos"])
-                resultado["avisos_segmentos_p"] = grupos["p"]
-                resultado["avisos_segmentos_q"] = grupos["q"]
-                resultado["avisos_segmentos_r"] = grupos["r"]
-                resultado["avisos_segmentos_convenio"] = grupos["conv"]
-                resultado["avisos_segmentos_outros"] = grupos["outros"]
+            resultado.titulos = listar_titulos_cnab240(codigo_banco, linhas, indices_p)
+
+        # Pós-processamentos específicos do banco (NN duplicado no BB, regras do Sicredi...)
+        for etapa in POS_PROCESSAMENTO_CNAB240.get(codigo_banco, ()):
+            etapa(linhas, resultado)
 
 
     elif layout == 400 and linhas:
@@ -327,39 +384,106 @@ def validar():
                     codigo_banco_arquivo = reg[150:153]
                     break
 
-        if codigo_banco_arquivo == "341":
-            analise = validar_cnab400_itau(linhas)
-        elif codigo_banco_arquivo == "748":
-            analise = validar_cnab400_sicredi(linhas)
-        elif codigo_banco_arquivo == "104":
-            analise = validar_cnab400_caixa(linhas)
-        elif codigo_banco_arquivo == "237":
-            analise = validar_cnab400_bradesco(linhas)
-        elif codigo_banco_arquivo == "033":
-            analise = validar_cnab400_santander(linhas)
-        elif codigo_banco_arquivo == "070":
-            analise = validar_cnab400_brb(linhas)
-        elif codigo_banco_arquivo == "021":
-            analise = validar_cnab400_banestes(linhas)
-        else:
-            analise = validar_cnab400_bb(linhas)
-        resultado["codigo_banco"] = analise.get("codigo_banco")
-        resultado["nome_banco"] = analise.get("nome_banco")
-        resultado["cnab400_erros_header"] = analise.get("erros_header", [])
-        resultado["cnab400_erros_registros"] = analise.get("erros_registros", [])
-        resultado["cnab400_erros_trailer"] = analise.get("erros_trailer", [])
-        resultado["cnab400_avisos"] = analise.get("avisos", [])
-        resultado["resumo_cnab400"] = analise.get("resumo")
-        resultado["cnab400_header_info"] = analise.get("header_info")
-        resultado["titulos"] = analise.get("titulos", [])
+        validador_400 = selecionar_validador_cnab400(codigo_banco_arquivo)
+        analise = validador_400(linhas)
+        resultado.codigo_banco = analise.get("codigo_banco")
+        resultado.nome_banco = analise.get("nome_banco")
+        resultado.cnab400_erros_header = analise.get("erros_header", [])
+        resultado.cnab400_erros_registros = analise.get("erros_registros", [])
+        resultado.cnab400_erros_trailer = analise.get("erros_trailer", [])
+        resultado.cnab400_avisos = analise.get("avisos", [])
+        resultado.resumo_cnab400 = analise.get("resumo")
+        resultado.cnab400_header_info = analise.get("header_info")
+        resultado.titulos = analise.get("titulos", [])
+
+    return resultado
+
+
+def _acrescentar_avisos_segmentos(resultado, novos):
+    """
+    Acrescenta novos avisos de segmentos ao resultado, classificando só os
+    novos e estendendo os grupos já existentes (sem reagrupar a lista inteira).
+    """
+    resultado.avisos_segmentos.extend(novos)
+
+    grupos = agrupar_avisos_segmentos(novos)
+    resultado.avisos_segmentos_p.extend(grupos["p"])
+    resultado.avisos_segmentos_q.extend(grupos["q"])
+    resultado.avisos_segmentos_r.extend(grupos["r"])
+    resultado.avisos_segmentos_convenio.extend(grupos["conv"])
+    resultado.avisos_segmentos_outros.extend(grupos["outros"])
+
+
+def _pos_bb_nosso_numero_duplicado(linhas, resultado):
+    """Validação avançada do BB: títulos com Nosso Número duplicado."""
+    if not resultado.titulos:
+        return
+    avisos_nn_dup = validar_nosso_numero_duplicado_titulos(resultado.titulos)
+    if avisos_nn_dup:
+        _acrescentar_avisos_segmentos(resultado, avisos_nn_dup)
+
+
+def _pos_sicredi_cnab240(linhas, resultado):
+    """Validações específicas do layout CNAB 240 do Sicredi."""
+    analise_sicredi = validar_cnab240_sicredi(linhas)
+    if analise_sicredi["erros_header"]:
+        resultado.erros_estrutura.extend(analise_sicredi["erros_header"])
+    if analise_sicredi["erros_segmentos"]:
+        resultado.erros_segmentos.extend(analise_sicredi["erros_segmentos"])
+    if analise_sicredi["avisos"]:
+        _acrescentar_avisos_segmentos(resultado, analise_sicredi["avisos"])
+
+
+# Etapas executadas, em ordem, depois das validações comuns do CNAB 240.
+# Cada etapa recebe (linhas, resultado) e completa o resultado.
+POS_PROCESSAMENTO_CNAB240 = {
+    "001": (_pos_bb_nosso_numero_duplicado,),
+    "748": (_pos_sicredi_cnab240,),
+}
+
+
+@app.route("/validar", methods=["POST"])
+def validar():
+    """
+    Recebe o arquivo de remessa + dados da conta/titular,
+    executa as validações usando o motor do validador_cnab.py
+    e devolve os resultados para a página resultado.html.
+    """
+    arquivo = request.files.get("arquivo")
+    if not arquivo:
+        return "Nenhum arquivo enviado.", 400
+
+    # Lê o arquivo em blocos, já separando as linhas e calculando o hash do conteúdo
+    hasher = hashlib.blake2b(digest_size=16)
+    linhas = list(_iter_linhas(arquivo.stream, hasher=hasher))
+
+    # Dados da conta/titular digitados pelo usuário
+    dados_conta = {
+        "banco": (request.form.get("banco") or "").strip(),
+        "agencia": (request.form.get("agencia") or "").strip(),
+        "conta": (request.form.get("conta") or "").strip(),
+        "documento": (request.form.get("documento") or "").strip(),
+        "nome": (request.form.get("nome") or "").strip(),
+    }
+
+    # O resultado depende só do conteúdo do arquivo (e da data atual, usada nos
+    # avisos de vencimento no passado); os dados da conta são conferidos a parte.
+    chave_cache = (hasher.digest(), date.today())
+    resultado = _obter_resultado_cache(chave_cache)
+    if resultado is None:
+        resultado = _analisar_remessa(linhas)
+        _guardar_resultado_cache(chave_cache, resultado, len(linhas))
 
+    # Conferência dos dados da conta/titular informados x dados do arquivo
+    if resultado.layout in (240, 400) and linhas:
         erros_dados, avisos_dados = validar_dados_cedente_vs_arquivo(
-            analise.get("codigo_banco") or "", linhas, dados_conta, layout=400
+            resultado.codigo_banco or "", linhas, dados_conta, layout=resultado.layout
         )
-        resultado["erros_dados_conta"] = erros_dados
-        resultado["avisos_dados_conta"] = avisos_dados
+        resultado.erros_dados_conta = erros_dados
+        resultado.avisos_dados_conta = avisos_dados
 
-    return render_template("resultado.html", resultado=resultado, dados_conta=dados_conta)
+    # Envia o HTML em partes conforme é renderizado (remessas grandes geram páginas longas)
+    return stream_template("resultado.html", resultado=resultado, dados_conta=dados_conta)
 
 
 @app.route("/boleto", methods=["GET", "POST"])
@@ -0,0 +1,70 @@
+import io
+
+import pytest
+
+from app import _iter_linhas
+
+
+@pytest.mark.parametrize("chunk", [1, 2, 3, 7, 65536])
+@pytest.mark.parametrize(
+    "conteudo",
+    [
+        b"",
+        b"linha1\r\nlinha2\r\n",
+        b"linha1\nlinha2",
+        b"a\r\n\r\nb\rc\n",
+        b"x\r\r\ny\r",
+        b"nome \xc7\xc3O\x0cfim\x85ultimo",
+    ],
+)
+def test_iter_linhas_equivale_a_splitlines(conteudo, chunk):
+    esperado = conteudo.decode("latin-1").splitlines()
+    assert list(_iter_linhas(io.BytesIO(conteudo), chunk=chunk)) == esperado
+
+
+def test_validar_reaproveita_resultado_mas_confere_dados_da_conta():
+    import app as app_module
+
+    header = "001" + "0000" + "0" + " " * 232
+    trailer = "001" + "9999" + "9" + " " * 9 + "000000" + "000002" + " " * 211
+    conteudo = (header + "\r\n" + trailer + "\r\n").encode("latin-1")
+    client = app_module.app.test_client()
+
+    def enviar(banco):
+        resposta = client.post(
+            "/validar",
+            data={"arquivo": (io.BytesIO(conteudo), "remessa.rem"), "banco": banco},
+            content_type="multipart/form-data",
+        )
+        assert resposta.status_code == 200
+        return resposta.get_data(as_text=True)
+
+    app_module._limpar_cache_resultados()
+    assert "Banco informado (237)" in enviar("237")
+    assert len(app_module._cache_resultados) == 1
+    html = enviar("104")
+    assert len(app_module._cache_resultados) == 1
+    assert "Banco informado (104)" in html
+    assert "Banco informado (237)" not in html
+
+
+def test_cache_de_resultados_devolve_copias_e_respeita_limite_de_linhas(monkeypatch):
+    import app as app_module
+
+    app_module._limpar_cache_resultados()
+    resultado = app_module.ResultadoRemessa(layout=240, erros_tamanho=["erro"])
+    app_module._guardar_resultado_cache("a", resultado, 10)
+
+    resultado.erros_tamanho.append("alterado depois de guardar")
+    copia = app_module._obter_resultado_cache("a")
+    assert copia.erros_tamanho == ["erro"]
+    copia.erros_tamanho.append("alterado na resposta")
+    assert app_module._obter_resultado_cache("a").erros_tamanho == ["erro"]
+
+    monkeypatch.setattr(app_module, "_CACHE_RESULTADOS_MAX_LINHAS", 25)
+    app_module._guardar_resultado_cache("grande", resultado, 26)
+    assert app_module._obter_resultado_cache("grande") is None
+    app_module._guardar_resultado_cache("b", resultado, 16)
+    assert app_module._obter_resultado_cache("a") is None
+    assert app_module._obter_resultado_cache("b") is not None
+    app_module._limpar_cache_resultados()
@@ -0,0 +1,30 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from validators import cli
+
+
+def test_main_com_varios_arquivos_segue_apos_falha_em_um_deles(tmp_path, monkeypatch, capsys):
+    vazio = tmp_path / "vazio.txt"
+    vazio.write_text("")
+    ruim = tmp_path / "ruim.txt"
+    ruim.write_text("")
+
+    analisar_original = cli.analisar_arquivo
+
+    def analisar_arquivo(caminho):
+        if caminho == str(ruim):
+            raise PermissionError(13, "Permission denied", caminho)
+        analisar_original(caminho)
+
+    # Uma thread em vez de processos: o monkeypatch vale para o worker e as
+    # capturas de stdout não se misturam
+    monkeypatch.setattr(cli, "ProcessPoolExecutor", lambda: ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(cli, "analisar_arquivo", analisar_arquivo)
+
+    cli.main([str(ruim), str(vazio)])
+
+    saida = capsys.readouterr().out
+    relatorio_ruim, relatorio_vazio = saida.split(f"##### {vazio} #####")
+    assert f"##### {ruim} #####" in relatorio_ruim
+    assert "Erro: nao foi possivel analisar o arquivo (PermissionError:" in relatorio_ruim
+    assert "Erro: arquivo esta vazio." in relatorio_vazio
@@ -0,0 +1,66 @@
+import io
+
+import pytest
+
+from validators.cnab240.common import (
+    gerar_resumo_remessa_cnab240,
+    indexar_segmentos_p_cnab240,
+    listar_titulos_cnab240,
+    validar_codigo_banco_consistente,
+    validar_estrutura_basica_cnab240,
+    validar_lotes_cnab240,
+    validar_qtd_registros_lote_cnab240,
+    validar_registros_cnab240,
+    validar_sequencia_registros_lote,
+    validar_totais_arquivo_cnab240,
+)
+
+
+def _registro(banco, lote, tipo, resto=""):
+    return (banco + lote + tipo + resto).ljust(240)
+
+
+HEADER = _registro("001", "0000", "0")
+HEADER_LOTE = _registro("001", "0001", "1")
+DETALHE_1 = _registro("001", "0001", "3", "00001P")
+DETALHE_3 = _registro("001", "0001", "3", "00003Q")
+DETALHE_X = _registro("001", "0001", "3", "0000XQ")
+TRAILER_LOTE = _registro("001", "0001", "5", " " * 9 + "000004")
+TRAILER = _registro("001", "9999", "9", " " * 9 + "000001000006")
+
+
+@pytest.mark.parametrize(
+    "linhas",
+    [
+        [HEADER, HEADER_LOTE, DETALHE_1, DETALHE_3, TRAILER_LOTE, TRAILER],
+        [HEADER + "\n", HEADER_LOTE + "\r\n", DETALHE_X + "\n", "\n", TRAILER + "\n"],
+        [_registro("104", "0000", "1"), "0012", "   ", DETALHE_1, _registro("001", "0002", "5")],
+        ["", "  "],
+    ],
+)
+def test_validar_registros_cnab240_equivale_as_validacoes_individuais(linhas):
+    esperado = {
+        "estrutura": validar_estrutura_basica_cnab240(linhas),
+        "totais": validar_totais_arquivo_cnab240(linhas),
+        "banco": validar_codigo_banco_consistente(linhas, "001"),
+        "lotes": validar_lotes_cnab240(linhas),
+        "lotes_qtd": validar_qtd_registros_lote_cnab240(linhas),
+        "sequencia": validar_sequencia_registros_lote(linhas),
+    }
+    assert validar_registros_cnab240(linhas, "001") == esperado
+
+
+def test_validar_registros_cnab240_aceita_arquivo_aberto():
+    linhas = [HEADER, HEADER_LOTE, DETALHE_1, DETALHE_3, TRAILER_LOTE, TRAILER]
+    arquivo = io.StringIO("".join(linha + "\n" for linha in linhas))
+
+    assert validar_registros_cnab240(arquivo, "001") == validar_registros_cnab240(linhas, "001")
+
+
+def test_indexar_segmentos_p_cnab240():
+    linhas = [HEADER, HEADER_LOTE, DETALHE_1, DETALHE_3, "", TRAILER_LOTE, TRAILER]
+    indices_p = indexar_segmentos_p_cnab240(linhas)
+
+    assert indices_p == [2]
+    assert gerar_resumo_remessa_cnab240("001", linhas, indices_p) == gerar_resumo_remessa_cnab240("001", linhas)
+    assert listar_titulos_cnab240("001", linhas, indices_p) == listar_titulos_cnab240("001", linhas)
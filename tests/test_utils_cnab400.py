@@ -2,6 +2,11 @@ import datetime
 
 import pytest
 
+from validators.cnab400 import (
+    selecionar_validador_cnab400,
+    validar_cnab400_bb,
+    validar_cnab400_itau,
+)
 from validators.cnab400.utils import _parse_data_cnab400, _parse_valor_cnab400
 
 
@@ -28,3 +33,16 @@ def test_parse_data_cnab400(valor, esperado):
 )
 def test_parse_valor_cnab400(raw, esperado):
     assert _parse_valor_cnab400(raw) == esperado
+
+
+@pytest.mark.parametrize(
+    "codigo_banco, esperado",
+    [
+        ("341", validar_cnab400_itau),
+        ("001", validar_cnab400_bb),
+        ("999", validar_cnab400_bb),
+        ("", validar_cnab400_bb),
+    ],
+)
+def test_selecionar_validador_cnab400(codigo_banco, esperado):
+    assert selecionar_validador_cnab400(codigo_banco) is esperado
@@ -21,10 +21,12 @@ from .cnab240 import (
     validar_qtd_registros_lote_cnab240,
     validar_totais_arquivo_cnab240,
     validar_sequencia_registros_lote,
+    validar_registros_cnab240,
     LAYOUT_CNAB240_COMUM_PQ,
     LAYOUTS_CNAB240,
     validar_segmentos_por_layout,
     validar_dados_cedente_vs_arquivo,
+    indexar_segmentos_p_cnab240,
     gerar_resumo_remessa_cnab240,
     listar_titulos_cnab240,
     validar_convenio_carteira_nosso_numero_bb,
@@ -76,7 +78,9 @@ from .cnab400 import (
     validar_cnab400_sicredi,
     validar_cnab400_caixa,
     validar_cnab400_bradesco,
-    validar_cnab400_santander
+    validar_cnab400_santander,
+    VALIDADORES_CNAB400,
+    selecionar_validador_cnab400
 )
 
 __all__ = [
@@ -98,10 +102,12 @@ __all__ = [
     "validar_qtd_registros_lote_cnab240",
     "validar_totais_arquivo_cnab240",
     "validar_sequencia_registros_lote",
+    "validar_registros_cnab240",
     "LAYOUT_CNAB240_COMUM_PQ",
     "LAYOUTS_CNAB240",
     "validar_segmentos_por_layout",
     "validar_dados_cedente_vs_arquivo",
+    "indexar_segmentos_p_cnab240",
     "gerar_resumo_remessa_cnab240",
     "listar_titulos_cnab240",
     "validar_convenio_carteira_nosso_numero_bb",
@@ -150,5 +156,7 @@ __all__ = [
     "validar_cnab400_sicredi",
     "validar_cnab400_caixa",
     "validar_cnab400_bradesco",
-    "validar_cnab400_santander"
+    "validar_cnab400_santander",
+    "VALIDADORES_CNAB400",
+    "selecionar_validador_cnab400"
 ]
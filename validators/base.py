@@ -1,6 +1,9 @@
 """Shared utilities and helpers for CNAB validators."""
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from itertools import cycle
+from operator import methodcaller, mul
 
 BANCOS_CNAB = {
     "001": "Banco do Brasil",
@@ -20,7 +23,10 @@ def detectar_layout(linhas):
     Tenta identificar se o arquivo é CNAB 240 ou 400
     olhando o tamanho das linhas.
     """
-    tamanhos = set(len(linha.rstrip("\n\r")) for linha in linhas if linha.strip() != "")
+    # Mesmo critério de validar_tamanho_linhas (ignora linhas em branco), mas com
+    # map/filter para que a varredura inteira rode em C, sem laço em Python.
+    sem_quebra = map(methodcaller("rstrip", "\n\r"), linhas)
+    tamanhos = set(map(len, filter(str.strip, sem_quebra)))
 
     if tamanhos == {240}:
         return 240
@@ -53,27 +59,58 @@ def identificar_banco(header_line):
     nome = BANCOS_CNAB.get(codigo, "Banco não mapeado neste validador")
     return codigo, nome
 
+@lru_cache(maxsize=4096)
 def _parse_data_ddmmaaaa(valor):
     """
     Converte uma string DDMMAAAA em date.
     Retorna None se estiver vazia, com tamanho errado ou inválida.
+    Em cache: as mesmas datas (vencimentos, datas de geração) se repetem muito.
     """
     if not valor or not valor.isdigit() or len(valor) != 8:
         return None
-    dia = int(valor[0:2])
-    mes = int(valor[2:4])
-    ano = int(valor[4:8])
+    dia, mes_ano = divmod(int(valor), 1000000)
+    mes, ano = divmod(mes_ano, 10000)
     try:
-        return datetime(ano, mes, dia).date()
+        return date(ano, mes, dia)
     except ValueError:
         return None
 
+# Tabela para str.translate: apaga todo caractere ASCII que não é dígito
+_NAO_DIGITOS_ASCII = dict.fromkeys(i for i in range(128) if not chr(i).isdigit())
+
 def limpar_numero(s: str) -> str:
     """
     Remove todos os caracteres que não são dígitos.
     """
-    return "".join(ch for ch in (s or "") if ch.isdigit())
+    s = s or ""
+    if s.isdigit():
+        # Já só tem dígitos (caso mais comum): nada a remover
+        return s
+    if s.isascii():
+        # Caso comum (CPF/CNPJ, campos do arquivo): remove tudo de uma vez em C
+        return s.translate(_NAO_DIGITOS_ASCII)
+    return "".join(ch for ch in s if ch.isdigit())
+
+# Pesos dos dígitos verificadores de CPF e CNPJ. validar_cpf/validar_cnpj ficam em
+# cache: o mesmo documento (sacado, cedente) costuma se repetir em muitos títulos.
+_PESOS_CPF_DV1 = (10, 9, 8, 7, 6, 5, 4, 3, 2)
+_PESOS_CPF_DV2 = (11,) + _PESOS_CPF_DV1
+_PESOS_CNPJ_DV1 = (5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)
+_PESOS_CNPJ_DV2 = (6,) + _PESOS_CNPJ_DV1
+
+# Converte os bytes b"0".."9" nos valores 0..9
+_VALOR_DIGITO_ASCII = bytes.maketrans(b"0123456789", bytes(range(10)))
+
+def _soma_ponderada(digitos: str, pesos) -> int:
+    """
+    Soma dos dígitos multiplicados pelos pesos, posição a posição
+    (considera só as primeiras len(pesos) posições).
+    """
+    if digitos.isascii():
+        return sum(map(mul, digitos.encode().translate(_VALOR_DIGITO_ASCII), pesos))
+    return sum(map(mul, map(int, digitos), pesos))
 
+@lru_cache(maxsize=4096)
 def validar_cpf(cpf: str) -> bool:
     cpf = limpar_numero(cpf)
     if len(cpf) != 11:
@@ -81,19 +118,13 @@ def validar_cpf(cpf: str) -> bool:
     if cpf == cpf[0] * 11:
         return False
 
-    soma = 0
-    for i in range(9):
-        soma += int(cpf[i]) * (10 - i)
-    resto = (soma * 10) % 11
+    resto = (_soma_ponderada(cpf, _PESOS_CPF_DV1) * 10) % 11
     if resto == 10:
         resto = 0
     if resto != int(cpf[9]):
         return False
 
-    soma = 0
-    for i in range(10):
-        soma += int(cpf[i]) * (11 - i)
-    resto = (soma * 10) % 11
+    resto = (_soma_ponderada(cpf, _PESOS_CPF_DV2) * 10) % 11
     if resto == 10:
         resto = 0
     if resto != int(cpf[10]):
@@ -101,6 +132,7 @@ def validar_cpf(cpf: str) -> bool:
 
     return True
 
+@lru_cache(maxsize=4096)
 def validar_cnpj(cnpj: str) -> bool:
     cnpj = limpar_numero(cnpj)
     if len(cnpj) != 14:
@@ -108,37 +140,43 @@ def validar_cnpj(cnpj: str) -> bool:
     if cnpj == cnpj[0] * 14:
         return False
 
-    pesos1 = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
-    pesos2 = [6] + pesos1
-
-    soma = sum(int(cnpj[i]) * pesos1[i] for i in range(12))
-    resto = soma % 11
+    resto = _soma_ponderada(cnpj, _PESOS_CNPJ_DV1) % 11
     dv1 = 0 if resto < 2 else 11 - resto
     if dv1 != int(cnpj[12]):
         return False
 
-    soma = sum(int(cnpj[i]) * pesos2[i] for i in range(13))
-    resto = soma % 11
+    resto = _soma_ponderada(cnpj, _PESOS_CNPJ_DV2) % 11
     dv2 = 0 if resto < 2 else 11 - resto
     if dv2 != int(cnpj[13]):
         return False
 
     return True
 
+# Módulo 10: valor de cada dígito multiplicado por 2 já com os algarismos somados
+# (ex.: 7 * 2 = 14 -> 1 + 4 = 5)
+_DOBRO_MODULO10 = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)
+
+# Módulo 11 do boleto: pesos de 2 a 9, repetidos da direita para a esquerda
+_PESOS_MODULO11_BOLETO = range(2, 10)
+
+def _digitos_invertidos(numero: str):
+    """
+    Valores dos dígitos de ``numero`` da direita para a esquerda.
+    Só dígitos ASCII (caso comum) são convertidos de uma vez em C; o resto passa
+    por int(), que aceita outros dígitos Unicode e rejeita o que não é dígito.
+    """
+    if numero.isascii() and numero.isdigit():
+        return numero.encode().translate(_VALOR_DIGITO_ASCII)[::-1]
+    return [int(ch) for ch in reversed(numero)]
+
 def modulo10(numero: str) -> int:
     """
     Calcula o dígito verificador pelo módulo 10 (usado nos 3 primeiros campos da linha digitável).
     """
-    soma = 0
-    multiplicador = 2
-    for d in reversed(numero):
-        n = int(d)
-        prod = n * multiplicador
-        # se resultado tiver 2 dígitos, soma os dígitos
-        if prod >= 10:
-            prod = (prod // 10) + (prod % 10)
-        soma += prod
-        multiplicador = 1 if multiplicador == 2 else 2
+    # Da direita para a esquerda os pesos alternam 2, 1, 2, 1...
+    invertido = _digitos_invertidos(numero)
+    soma = sum(map(_DOBRO_MODULO10.__getitem__, invertido[::2]))
+    soma += sum(invertido[1::2])
 
     resto = soma % 10
     dv = (10 - resto) % 10
@@ -152,14 +190,7 @@ def modulo11_boleto(numero: str) -> int:
       - DV = 11 - (soma % 11)
       - se resultado em [0, 1, 10, 11], utiliza-se '1' (padrão mais comum).
     """
-    soma = 0
-    peso = 2
-    for d in reversed(numero):
-        n = int(d)
-        soma += n * peso
-        peso += 1
-        if peso > 9:
-            peso = 2
+    soma = sum(map(mul, _digitos_invertidos(numero), cycle(_PESOS_MODULO11_BOLETO)))
 
     resto = soma % 11
     dv = 11 - resto
@@ -167,6 +198,9 @@ def modulo11_boleto(numero: str) -> int:
         dv = 1
     return dv
 
+# Data base do fator de vencimento (FEBRABAN): fator 0001 = 08/10/1997
+_DATA_BASE_FATOR_VENCIMENTO = datetime(1997, 10, 7)
+
 def validar_linha_digitavel_boleto(linha: str):
     """
     Valida uma linha digitável de boleto bancário (47 dígitos, padrão cobrança).
@@ -210,19 +244,22 @@ def validar_linha_digitavel_boleto(linha: str):
     valor_str = d[37:47]
 
     # 1) Validar DVs dos 3 campos com módulo 10
-    if modulo10(campo1) != dv1:
+    dv1_calculado = modulo10(campo1)
+    if dv1_calculado != dv1:
         erros.append(
-            f"Dígito verificador do Campo 1 inválido. Esperado {modulo10(campo1)}, encontrado {dv1}."
+            f"Dígito verificador do Campo 1 inválido. Esperado {dv1_calculado}, encontrado {dv1}."
         )
 
-    if modulo10(campo2) != dv2:
+    dv2_calculado = modulo10(campo2)
+    if dv2_calculado != dv2:
         erros.append(
-            f"Dígito verificador do Campo 2 inválido. Esperado {modulo10(campo2)}, encontrado {dv2}."
+            f"Dígito verificador do Campo 2 inválido. Esperado {dv2_calculado}, encontrado {dv2}."
         )
 
-    if modulo10(campo3) != dv3:
+    dv3_calculado = modulo10(campo3)
+    if dv3_calculado != dv3:
         erros.append(
-            f"Dígito verificador do Campo 3 inválido. Esperado {modulo10(campo3)}, encontrado {dv3}."
+            f"Dígito verificador do Campo 3 inválido. Esperado {dv3_calculado}, encontrado {dv3}."
         )
 
     # 2) Montar código de barras (44 dígitos) a partir da linha digitável
@@ -262,9 +299,8 @@ def validar_linha_digitavel_boleto(linha: str):
         infos["vencimento"] = "Sem data de vencimento (fator 0000)"
     else:
         try:
-            base = datetime(1997, 10, 7)
             dias = int(fator)
-            dt = base + timedelta(days=dias)
+            dt = _DATA_BASE_FATOR_VENCIMENTO + timedelta(days=dias)
             infos["vencimento"] = dt.strftime("%d/%m/%Y")
         except Exception:
             erros.append(f"Fator de vencimento '{fator}' inválido.")
@@ -282,9 +318,9 @@ def validar_linha_digitavel_boleto(linha: str):
 
     return erros, infos
 
-ESTADOS_BR = {
+ESTADOS_BR = frozenset({
     "AC", "AL", "AP", "AM", "BA", "CE", "DF", "ES",
     "GO", "MA", "MT", "MS", "MG", "PA", "PB", "PR",
     "PE", "PI", "RJ", "RN", "RS", "RO", "RR", "SC",
     "SP", "SE", "TO",
-}
+})
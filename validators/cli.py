@@ -1,6 +1,10 @@
 """Utilitário de linha de comando para o validador CNAB."""
 
+import io
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from .base import (
     BANCOS_CNAB,
     detectar_layout,
@@ -25,28 +29,62 @@ from .cnab240 import (
     validar_sequencia_registros_lote,
     validar_totais_arquivo_cnab240,
 )
-from .cnab400 import (
-    validar_cnab400_bb,
-    validar_cnab400_brb,
-    validar_cnab400_banestes,
-    validar_cnab400_bradesco,
-    validar_cnab400_caixa,
-    validar_cnab400_itau,
-    validar_cnab400_santander,
-    validar_cnab400_sicredi,
-)
+from .cnab400 import selecionar_validador_cnab400
 
 
-def main():
+def main(caminhos=None):
+    """
+    Sem ``caminhos``, pergunta o caminho de um arquivo e mostra a análise.
+    Com vários caminhos (ex.: ``python validador_cnab.py *.txt``), analisa os
+    arquivos em paralelo, um processo por núcleo, e mostra os relatórios na
+    ordem informada.
+    """
     print("=== Validador simples de arquivos CNAB 240/400 ===")
-    caminho = input("Informe o caminho completo do arquivo de remessa (.txt): ").strip()
+    if not caminhos:
+        caminho = input("Informe o caminho completo do arquivo de remessa (.txt): ").strip()
+        analisar_arquivo(caminho)
+        return
+
+    if len(caminhos) == 1:
+        analisar_arquivo(caminhos[0])
+        return
+
+    with ProcessPoolExecutor() as executor:
+        for caminho, relatorio in zip(caminhos, executor.map(_relatorio_arquivo, caminhos)):
+            print(f"\n##### {caminho} #####")
+            print(relatorio, end="")
+
 
+def _imprimir_itens(itens):
+    """Imprime cada item como "   - item" com uma única escrita no stdout."""
+    sys.stdout.write("".join(f"   - {item}\n" for item in itens))
+
+
+def _relatorio_arquivo(caminho):
+    """
+    Executa analisar_arquivo capturando a saída (usado pelos processos do pool).
+    Uma falha ao analisar o arquivo vira uma mensagem de erro no relatório dele,
+    sem interromper a análise dos demais arquivos.
+    """
+    saida = io.StringIO()
+    with redirect_stdout(saida):
+        try:
+            analisar_arquivo(caminho)
+        except Exception as exc:
+            print(f"Erro: nao foi possivel analisar o arquivo ({type(exc).__name__}: {exc}).")
+    return saida.getvalue()
+
+
+def analisar_arquivo(caminho):
+    """Valida um arquivo de remessa e imprime o relatório no terminal."""
     if not os.path.isfile(caminho):
         print("Erro: arquivo nao encontrado. Verifique o caminho e tente novamente.")
         return
 
+    # Tira a quebra de linha uma única vez, na leitura: os validadores recebem as
+    # linhas já limpas (rstrip de uma linha sem quebra não gera nova string)
     with open(caminho, "r", encoding="latin-1") as f:
-        linhas = f.readlines()
+        linhas = [linha.rstrip("\r\n") for linha in f]
 
     if not linhas:
         print("Erro: arquivo esta vazio.")
@@ -69,8 +107,7 @@ def main():
         print("OK. Todas as linhas estao com o tamanho correto.")
     else:
         print("Erros de tamanho de linha:")
-        for erro in erros_tamanho:
-            print("   -", erro)
+        _imprimir_itens(erros_tamanho)
 
     if layout == 240:
         print("\n=== Analisando estrutura basica CNAB 240 ===")
@@ -80,8 +117,7 @@ def main():
         erros_estrutura = validar_estrutura_basica_cnab240(linhas)
         if erros_estrutura:
             print("Problemas na estrutura do arquivo:")
-            for erro in erros_estrutura:
-                print("   -", erro)
+            _imprimir_itens(erros_estrutura)
         else:
             print("OK. Estrutura basica (header/trailer/tipos de registro) esta OK.")
 
@@ -89,8 +125,7 @@ def main():
         erros_banco = validar_codigo_banco_consistente(linhas, codigo_banco)
         if erros_banco:
             print("Inconsistencias de codigo de banco:")
-            for erro in erros_banco:
-                print("   -", erro)
+            _imprimir_itens(erros_banco)
         else:
             print("OK. Todas as linhas possuem o mesmo codigo de banco do header.")
 
@@ -98,8 +133,7 @@ def main():
         erros_lotes = validar_lotes_cnab240(linhas)
         if erros_lotes:
             print("Problemas na estrutura de lotes:")
-            for erro in erros_lotes:
-                print("   -", erro)
+            _imprimir_itens(erros_lotes)
         else:
             print("OK. Estrutura de lotes esta OK (header, detalhes e trailer).")
 
@@ -107,8 +141,7 @@ def main():
         erros_seq = validar_sequencia_registros_lote(linhas)
         if erros_seq:
             print("Problemas na sequencia dos registros:")
-            for erro in erros_seq:
-                print("   -", erro)
+            _imprimir_itens(erros_seq)
         else:
             print("OK. Sequencia dos registros nos lotes esta OK.")
 
@@ -116,12 +149,10 @@ def main():
         erros_seg, avisos_seg = validar_segmentos_por_layout(codigo_banco, linhas)
         if avisos_seg:
             print("Avisos em segmentos:")
-            for aviso in avisos_seg:
-                print("   -", aviso)
+            _imprimir_itens(avisos_seg)
         if erros_seg:
             print("Erros em segmentos (P, Q, etc.):")
-            for erro in erros_seg:
-                print("   -", erro)
+            _imprimir_itens(erros_seg)
         else:
             print("Nenhum erro encontrado nos segmentos configurados para este banco.")
     else:
@@ -139,22 +170,8 @@ def main():
                 if reg.startswith("01") and len(reg) >= 153:
                     codigo_banco_arquivo = reg[150:153]
                     break
-        if codigo_banco_arquivo == "341":
-            analise = validar_cnab400_itau(linhas)
-        elif codigo_banco_arquivo == "748":
-            analise = validar_cnab400_sicredi(linhas)
-        elif codigo_banco_arquivo == "104":
-            analise = validar_cnab400_caixa(linhas)
-        elif codigo_banco_arquivo == "237":
-            analise = validar_cnab400_bradesco(linhas)
-        elif codigo_banco_arquivo == "033":
-            analise = validar_cnab400_santander(linhas)
-        elif codigo_banco_arquivo == "070":
-            analise = validar_cnab400_brb(linhas)
-        elif codigo_banco_arquivo == "021":
-            analise = validar_cnab400_banestes(linhas)
-        else:
-            analise = validar_cnab400_bb(linhas)
+        validador_400 = selecionar_validador_cnab400(codigo_banco_arquivo)
+        analise = validador_400(linhas)
 
         codigo_banco = analise.get("codigo_banco") or "N/D"
         nome_banco = analise.get("nome_banco") or "Banco nao identificado"
@@ -162,29 +179,25 @@ def main():
 
         if analise.get("erros_header"):
             print("\nProblemas no header:")
-            for erro in analise["erros_header"]:
-                print("   -", erro)
+            _imprimir_itens(analise["erros_header"])
         else:
             print("\nHeader verificado sem erros criticos.")
 
         if analise.get("erros_registros"):
             print("\nProblemas nos registros de detalhe:")
-            for erro in analise["erros_registros"]:
-                print("   -", erro)
+            _imprimir_itens(analise["erros_registros"])
         else:
             print("\nNenhum erro critico encontrado nos registros de detalhe.")
 
         if analise.get("erros_trailer"):
             print("\nProblemas no trailer/sequencia:")
-            for erro in analise["erros_trailer"]:
-                print("   -", erro)
+            _imprimir_itens(analise["erros_trailer"])
         else:
             print("\nTrailer e sequencia geral consistentes.")
 
         if analise.get("avisos"):
             print("\nAvisos:")
-            for aviso in analise["avisos"]:
-                print("   -", aviso)
+            _imprimir_itens(analise["avisos"])
 
         resumo = analise.get("resumo") or {}
         print("\n=== Resumo rapido ===")
@@ -200,4 +213,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1:])
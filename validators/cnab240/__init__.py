@@ -6,10 +6,12 @@ from .common import (
     validar_qtd_registros_lote_cnab240,
     validar_totais_arquivo_cnab240,
     validar_sequencia_registros_lote,
+    validar_registros_cnab240,
     LAYOUT_CNAB240_COMUM_PQ,
     LAYOUTS_CNAB240,
     validar_segmentos_por_layout,
     validar_dados_cedente_vs_arquivo,
+    indexar_segmentos_p_cnab240,
     gerar_resumo_remessa_cnab240,
     listar_titulos_cnab240
 )
@@ -39,10 +41,12 @@ __all__ = [
     "validar_qtd_registros_lote_cnab240",
     "validar_totais_arquivo_cnab240",
     "validar_sequencia_registros_lote",
+    "validar_registros_cnab240",
     "LAYOUT_CNAB240_COMUM_PQ",
     "LAYOUTS_CNAB240",
     "validar_segmentos_por_layout",
     "validar_dados_cedente_vs_arquivo",
+    "indexar_segmentos_p_cnab240",
     "gerar_resumo_remessa_cnab240",
     "listar_titulos_cnab240",
     "validar_convenio_carteira_nosso_numero_bb",
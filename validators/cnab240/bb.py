@@ -1,9 +1,29 @@
 """Validações específicas do Banco do Brasil para CNAB 240."""
 
 from datetime import datetime
-from ..base import _parse_data_ddmmaaaa, limpar_numero
+from operator import itemgetter
+from ..base import ESTADOS_BR, _parse_data_ddmmaaaa, limpar_numero
 from .common import LAYOUTS_CNAB240
 
+# Carteiras de cobrança mais usuais no BB (as demais geram apenas aviso)
+CARTEIRAS_MAIS_COMUNS_BB = frozenset({"11", "12", "17", "31", "51"})
+
+# Códigos de movimento mais comuns / permitidos no Segmento P (pos. 16-17)
+CODIGOS_MOVIMENTO_BB = frozenset({
+    "01",  # entrada de títulos
+    "02",  # pedido de baixa
+    "04",  # concessão de abatimento
+    "05",  # cancelamento de abatimento
+    "06",  # alteração de vencimento
+    "09",  # instrução de protesto
+    "10",  # sustação de protesto
+    "18",  # sustação de protesto / baixa
+    "31",  # alteração de outros dados
+})
+
+# Caracteres aceitos no Nosso Número (dígitos e, eventualmente, um 'X')
+_CARACTERES_NOSSO_NUMERO_BB = "0123456789Xx"
+
 def validar_convenio_carteira_nosso_numero_bb(linhas):
     """
     Validações avançadas específicas do Banco do Brasil (CNAB 240):
@@ -20,8 +40,11 @@ def validar_convenio_carteira_nosso_numero_bb(linhas):
     erros = []
     avisos = []
 
-    # 1) Mapear por lote o convênio / carteira a partir do Header de Lote (tipo de registro '1')
+    # 1) Mapear por lote o convênio / carteira a partir do Header de Lote (tipo de registro '1').
+    # Na mesma passada, separa os Segmentos P, conferidos depois (o header do lote
+    # pode aparecer depois do detalhe em arquivos fora de ordem).
     lotes_info = {}
+    segmentos_p = []  # (idx, linha sem quebra, lote)
 
     for idx, linha in enumerate(linhas, start=1):
         l = linha.rstrip("\r\n")
@@ -31,6 +54,10 @@ def validar_convenio_carteira_nosso_numero_bb(linhas):
         tipo_reg = l[7:8]   # posição 8 (1-based)
         lote = l[3:7]       # posições 4-7 (1-based)
 
+        if tipo_reg == "3":
+            if l[13:14] == "P":
+                segmentos_p.append((idx, l, lote))
+            continue
         if tipo_reg != "1":
             continue
 
@@ -88,8 +115,7 @@ def validar_convenio_carteira_nosso_numero_bb(linhas):
                     f"Número da carteira de cobrança '{carteira}' não é numérico."
                 )
             else:
-                carteiras_mais_comuns = {"11", "12", "17", "31", "51"}
-                if carteira not in carteiras_mais_comuns:
+                if carteira not in CARTEIRAS_MAIS_COMUNS_BB:
                     avisos.append(
                         f"Linha {idx} (Lote {lote}, Header de Lote): "
                         f"Carteira de cobrança '{carteira}' não está entre as carteiras mais usuais "
@@ -98,21 +124,7 @@ def validar_convenio_carteira_nosso_numero_bb(linhas):
                     )
 
     # 2) Para cada Segmento P, conferir formação do Nosso Número x convênio
-    for idx, linha in enumerate(linhas, start=1):
-        l = linha.rstrip("\r\n")
-        if len(l) < 60:
-            continue
-
-        tipo_reg = l[7:8]
-        if tipo_reg != "3":
-            continue
-
-        lote = l[3:7]
-        segmento = l[13:14]
-
-        if segmento != "P":
-            continue
-
+    for idx, l, lote in segmentos_p:
         info_lote = lotes_info.get(lote)
         if not info_lote:
             # Se não achar o header do lote, não tem como validar convênio x Nosso Número
@@ -141,7 +153,7 @@ def validar_convenio_carteira_nosso_numero_bb(linhas):
             continue
 
         # Considerar apenas dígitos para checagem de tamanho/convênio
-        nn_digitos = "".join(ch for ch in nn_compacto if ch.isdigit())
+        nn_digitos = limpar_numero(nn_compacto)
         tam_nn = len(nn_digitos)
 
         # Regras do manual do BB para composição do Nosso Número em função do convênio :contentReference[oaicite:5]{index=5}
@@ -196,11 +208,33 @@ def validar_convenio_carteira_nosso_numero_bb(linhas):
 
     return erros, avisos
 
+# Campos de posição fixa do Segmento P lidos pela validação avançada, todos
+# numa só chamada (linhas com menos posições só geram fatias vazias/parciais,
+# e cada bloco confere o tamanho da linha antes de usá-los):
+#   juros de mora (pos. 118, 119-126, 127-141), desconto 1 (142, 143-150, 151-165),
+#   protesto (221, 222-223), baixa/devolução (224, 225-227),
+#   vencimento (78-85) e emissão (110-117)
+_CAMPOS_FIXOS_P_BB = itemgetter(
+    slice(117, 118), slice(118, 126), slice(126, 141),
+    slice(141, 142), slice(142, 150), slice(150, 165),
+    slice(220, 221), slice(221, 223), slice(223, 224), slice(224, 227),
+    slice(77, 85), slice(109, 117),
+)
+
+def _posicoes_campo(campos, nome):
+    """(início, fim) do campo no layout, ou None se o layout não o tiver."""
+    cfg = campos.get(nome)
+    return (cfg["start"], cfg["end"]) if cfg else None
+
 def validar_segmentos_avancados_bb(linhas):
     """
     Validações adicionais (modo permissivo: geram avisos) para:
     - Banco do Brasil (001), CNAB 240
     focadas em Segmentos P e Q.
+
+    ``linhas`` pode ser qualquer iterável de linhas (lista, arquivo aberto em
+    modo texto...): as linhas são lidas uma única vez, com ou sem a quebra de
+    linha no final, e não precisam estar todas em memória.
     """
 
     avisos = []
@@ -214,58 +248,55 @@ def validar_segmentos_avancados_bb(linhas):
     cod_mov_start = 15
     cod_mov_end = 17
 
-    # códigos de movimento mais comuns / permitidos
-    codigos_mov_validos = {
-        "01",  # entrada de títulos
-        "02",  # pedido de baixa
-        "04",  # concessão de abatimento
-        "05",  # cancelamento de abatimento
-        "06",  # alteração de vencimento
-        "09",  # instrução de protesto
-        "10",  # sustação de protesto
-        "18",  # sustação de protesto / baixa
-        "31",  # alteração de outros dados
-    }
-
     # Para usar o layout cadastrado (P/Q) que já está em LAYOUTS_CNAB240
+    # (posições lidas uma vez aqui, fora do laço das linhas)
     layout_bb = LAYOUTS_CNAB240.get("001", {})
     campos_p = layout_bb.get("P", {})
     campos_q = layout_bb.get("Q", {})
 
-    cfg_venc = campos_p.get("data_vencimento")
-    cfg_valor = campos_p.get("valor_titulo")
-    cfg_nosso = campos_p.get("nosso_numero")
-
-    cfg_tipo_insc = campos_q.get("tipo_inscricao")
-    cfg_doc_sac = campos_q.get("documento_sacado")
-    cfg_nome_sac = campos_q.get("nome_sacado")
-    cfg_endereco = campos_q.get("endereco_sacado")
-    cfg_bairro = campos_q.get("bairro_sacado")
-    cfg_cep = campos_q.get("cep_sacado")
-    cfg_cidade = campos_q.get("cidade_sacado")
-    cfg_uf = campos_q.get("uf_sacado")
+    pos_venc = _posicoes_campo(campos_p, "data_vencimento")
+    pos_valor = _posicoes_campo(campos_p, "valor_titulo")
+    pos_nosso = _posicoes_campo(campos_p, "nosso_numero")
+
+    pos_tipo_insc = _posicoes_campo(campos_q, "tipo_inscricao")
+    pos_doc_sac = _posicoes_campo(campos_q, "documento_sacado")
+    pos_nome_sac = _posicoes_campo(campos_q, "nome_sacado")
+    pos_endereco = _posicoes_campo(campos_q, "endereco_sacado")
+    pos_bairro = _posicoes_campo(campos_q, "bairro_sacado")
+    pos_cep = _posicoes_campo(campos_q, "cep_sacado")
+    pos_cidade = _posicoes_campo(campos_q, "cidade_sacado")
+    pos_uf = _posicoes_campo(campos_q, "uf_sacado")
+
+    # Campos do Segmento Q lidos todos de uma vez por um itemgetter de fatias;
+    # campo ausente no layout vira a fatia vazia (os guardas abaixo o ignoram)
+    ler_campos_q = itemgetter(*(
+        slice(*pos) if pos else slice(0, 0)
+        for pos in (pos_tipo_insc, pos_doc_sac, pos_nome_sac, pos_endereco, pos_cidade, pos_uf, pos_cep)
+    ))
 
     hoje = datetime.today().date()
-    ufs_validas = {
-        "AC", "AL", "AP", "AM", "BA", "CE", "DF", "ES",
-        "GO", "MA", "MT", "MS", "MG", "PA", "PB", "PR",
-        "PE", "PI", "RJ", "RN", "RS", "RO", "RR", "SC",
-        "SP", "SE", "TO"
-    }
 
     for idx, linha in enumerate(linhas, start=1):
-        if not linha or linha.strip() == "":
+        if not linha or linha.isspace():
             continue
         linha = linha.rstrip("\r\n")
-        if len(linha) < 160:  # só considera linhas de detalhe com tamanho razoável
+        # Tamanho calculado uma vez: os blocos abaixo o consultam antes de cada grupo de campos
+        tamanho = len(linha)
+        if tamanho < 160:  # só considera linhas de detalhe com tamanho razoável
             continue
 
         tipo_registro = linha[7:8]
-        segmento = linha[13:14].upper()
+        segmento = linha[13:14]
 
         # ---------------- Segmento P ----------------
-        if tipo_registro == "3" and segmento == "P":
+        if tipo_registro == "3" and segmento in ("P", "p"):
             lote = linha[3:7]
+            (
+                cod_juros, data_juros_raw, valor_juros_raw,
+                cod_desc1, data_desc1_raw, valor_desc1_raw,
+                cod_prot, dias_prot_raw, cod_baixa, dias_baixa_raw,
+                data_venc_raw, data_emis_raw,
+            ) = map(str.strip, _CAMPOS_FIXOS_P_BB(linha))
 
             # Código de movimento
             cod_mov = linha[cod_mov_start:cod_mov_end].strip()
@@ -273,65 +304,62 @@ def validar_segmentos_avancados_bb(linhas):
                 avisos.append(
                     f"Linha {idx} (Lote {lote}, Seg. P): código de movimento '{cod_mov}' fora do padrão de 2 dígitos."
                 )
-            elif cod_mov and cod_mov not in codigos_mov_validos:
+            elif cod_mov and cod_mov not in CODIGOS_MOVIMENTO_BB:
                 avisos.append(
                     f"Linha {idx} (Lote {lote}, Seg. P): código de movimento '{cod_mov}' não está na lista de códigos mais comuns. "
                     "Verifique se está de acordo com o manual do banco."
                 )
 
             # Data de vencimento
-            if cfg_venc:
-                s, e = cfg_venc["start"], cfg_venc["end"]
-                if len(linha) >= e:
+            if pos_venc:
+                s, e = pos_venc
+                if tamanho >= e:
                     data_raw = linha[s:e].strip()
                     if data_raw and (not data_raw.isdigit() or len(data_raw) != 8):
                         avisos.append(
                             f"Linha {idx} (Lote {lote}, Seg. P): data de vencimento '{data_raw}' não está no formato DDMMAAAA."
                         )
                     elif data_raw.isdigit():
-                        dia = int(data_raw[0:2])
-                        mes = int(data_raw[2:4])
-                        ano = int(data_raw[4:8])
-                        try:
-                            dt = datetime(ano, mes, dia).date()
-                            if dt < hoje:
-                                avisos.append(
-                                    f"Linha {idx} (Lote {lote}, Seg. P): data de vencimento {dt.strftime('%d/%m/%Y')} está no passado em relação à data atual."
-                                )
-                        except ValueError:
+                        # Conversão em cache (base._parse_data_ddmmaaaa): None se a data não existe
+                        dt = _parse_data_ddmmaaaa(data_raw)
+                        if dt is None:
                             avisos.append(
                                 f"Linha {idx} (Lote {lote}, Seg. P): data de vencimento '{data_raw}' é inválida."
                             )
+                        elif dt < hoje:
+                            avisos.append(
+                                f"Linha {idx} (Lote {lote}, Seg. P): data de vencimento {dt.strftime('%d/%m/%Y')} está no passado em relação à data atual."
+                            )
 
             # Valor do título
-            if cfg_valor:
-                s, e = cfg_valor["start"], cfg_valor["end"]
-                if len(linha) >= e:
+            if pos_valor:
+                s, e = pos_valor
+                if tamanho >= e:
                     valor_raw = linha[s:e].strip()
                     if not valor_raw.isdigit():
                         avisos.append(
                             f"Linha {idx} (Lote {lote}, Seg. P): valor do título '{valor_raw}' não é numérico."
                         )
-                    else:
-                        valor_cent = int(valor_raw)
-                        if valor_cent == 0:
-                            avisos.append(
-                                f"Linha {idx} (Lote {lote}, Seg. P): valor do título é zero. Verifique se está correto."
-                            )
+                    elif not valor_raw.strip("0"):
+                        # Só dígitos: é zero quando não sobra nada ao tirar os '0'
+                        # (sem converter os 15 dígitos em int)
+                        avisos.append(
+                            f"Linha {idx} (Lote {lote}, Seg. P): valor do título é zero. Verifique se está correto."
+                        )
 
             # Nosso número (validação de formato, não de regra exata de DV)
-            if cfg_nosso:
-                s, e = cfg_nosso["start"], cfg_nosso["end"]
-                if len(linha) >= e:
+            if pos_nosso:
+                s, e = pos_nosso
+                if tamanho >= e:
                     nn_raw = linha[s:e].strip()
                     if not nn_raw:
                         avisos.append(
                             f"Linha {idx} (Lote {lote}, Seg. P): Nosso Número em branco."
                         )
                     else:
-                        # Permite dígitos e, eventualmente, um 'X'
-                        permitido = set("0123456789Xx")
-                        if any(ch not in permitido for ch in nn_raw):
+                        # Permite dígitos e, eventualmente, um 'X': tirando das pontas
+                        # os caracteres aceitos, sobra algo só se houver um inválido
+                        if nn_raw.strip(_CARACTERES_NOSSO_NUMERO_BB):
                             avisos.append(
                                 f"Linha {idx} (Lote {lote}, Seg. P): Nosso Número '{nn_raw}' contém caracteres inválidos."
                             )
@@ -345,11 +373,7 @@ def validar_segmentos_avancados_bb(linhas):
             # Código de Juros de Mora: posição 118 (1 dígito)
             # Data de Juros de Mora:   posições 119-126 (DDMMAAAA)
             # Valor/Taxa Juros Mora:   posições 127-141 (15 dígitos, valor em centavos)
-            if len(linha) >= 141:
-                cod_juros = linha[117:118].strip()
-                data_juros_raw = linha[118:126].strip()
-                valor_juros_raw = linha[126:141].strip()
-
+            if tamanho >= 141:
                 # Códigos mais usuais: 0=sem juros, 1=valor ao dia, 2=taxa mensal, 3=isento
                 if cod_juros and cod_juros not in {"0", "1", "2", "3"}:
                     avisos.append(
@@ -364,16 +388,10 @@ def validar_segmentos_avancados_bb(linhas):
                             f"Linha {idx} (Lote {lote}, Seg. P): código de juros '{cod_juros}' informado, "
                             f"mas a data de início dos juros '{data_juros_raw}' não está no formato DDMMAAAA."
                         )
-                    else:
-                        dia_j = int(data_juros_raw[0:2])
-                        mes_j = int(data_juros_raw[2:4])
-                        ano_j = int(data_juros_raw[4:8])
-                        try:
-                            _ = datetime(ano_j, mes_j, dia_j).date()
-                        except ValueError:
-                            avisos.append(
-                                f"Linha {idx} (Lote {lote}, Seg. P): data de início dos juros '{data_juros_raw}' é inválida."
-                            )
+                    elif _parse_data_ddmmaaaa(data_juros_raw) is None:
+                        avisos.append(
+                            f"Linha {idx} (Lote {lote}, Seg. P): data de início dos juros '{data_juros_raw}' é inválida."
+                        )
 
                     if not valor_juros_raw or not valor_juros_raw.isdigit():
                         avisos.append(
@@ -381,7 +399,7 @@ def validar_segmentos_avancados_bb(linhas):
                             f"mas o valor/taxa de juros '{valor_juros_raw}' não é numérico."
                         )
                     else:
-                        if int(valor_juros_raw) == 0:
+                        if not valor_juros_raw.strip("0"):
                             avisos.append(
                                 f"Linha {idx} (Lote {lote}, Seg. P): código de juros '{cod_juros}' informado, "
                                 "mas o valor/taxa de juros está zerado. Verifique se o campo foi preenchido corretamente."
@@ -401,11 +419,7 @@ def validar_segmentos_avancados_bb(linhas):
             # Código do Desconto 1: posição 142 (1 dígito)
             # Data do Desconto 1:   posições 143-150 (DDMMAAAA)
             # Valor do Desconto 1:  posições 151-165 (15 dígitos, valor em centavos)
-            if len(linha) >= 165:
-                cod_desc1 = linha[141:142].strip()
-                data_desc1_raw = linha[142:150].strip()
-                valor_desc1_raw = linha[150:165].strip()
-
+            if tamanho >= 165:
                 # Códigos mais usuais para desconto: 0=sem desconto, 1=valor fixo, 2=percentual, 3=valor por dia, etc.
                 if cod_desc1 and cod_desc1 not in {"0", "1", "2", "3"}:
                     avisos.append(
@@ -420,16 +434,10 @@ def validar_segmentos_avancados_bb(linhas):
                             f"Linha {idx} (Lote {lote}, Seg. P): código de desconto '{cod_desc1}' informado, "
                             f"mas a data do desconto '{data_desc1_raw}' não está no formato DDMMAAAA."
                         )
-                    else:
-                        dia_d = int(data_desc1_raw[0:2])
-                        mes_d = int(data_desc1_raw[2:4])
-                        ano_d = int(data_desc1_raw[4:8])
-                        try:
-                            _ = datetime(ano_d, mes_d, dia_d).date()
-                        except ValueError:
-                            avisos.append(
-                                f"Linha {idx} (Lote {lote}, Seg. P): data do desconto '{data_desc1_raw}' é inválida."
-                            )
+                    elif _parse_data_ddmmaaaa(data_desc1_raw) is None:
+                        avisos.append(
+                            f"Linha {idx} (Lote {lote}, Seg. P): data do desconto '{data_desc1_raw}' é inválida."
+                        )
 
                     if not valor_desc1_raw or not valor_desc1_raw.isdigit():
                         avisos.append(
@@ -437,7 +445,7 @@ def validar_segmentos_avancados_bb(linhas):
                             f"mas o valor do desconto '{valor_desc1_raw}' não é numérico."
                         )
                     else:
-                        if int(valor_desc1_raw) == 0:
+                        if not valor_desc1_raw.strip("0"):
                             avisos.append(
                                 f"Linha {idx} (Lote {lote}, Seg. P): código de desconto '{cod_desc1}' informado, "
                                 "mas o valor do desconto está zerado. Verifique se o campo foi preenchido corretamente."
@@ -448,12 +456,7 @@ def validar_segmentos_avancados_bb(linhas):
             # Número de Dias para Protesto:posição 222-223 (2 dígitos)
             # Código para Baixa/Devolução: posição 224 (1 dígito)
             # Dias para Baixa/Devolução:   posição 225-227 (3 dígitos)
-            if len(linha) >= 227:
-                cod_prot = linha[220:221].strip()
-                dias_prot_raw = linha[221:223].strip()
-                cod_baixa = linha[223:224].strip()
-                dias_baixa_raw = linha[224:227].strip()
-
+            if tamanho >= 227:
                 # --- PROTESTO ---
                 # Códigos usuais (podem variar por banco, mas em geral):
                 # '1' = Protestar dias corridos
@@ -543,12 +546,9 @@ def validar_segmentos_avancados_bb(linhas):
                             "mas há informação preenchida em data/valor de desconto. Verifique se o código está coerente."
                         )
 
-                        # --- Coerência entre datas: emissão, vencimento, desconto e juros ---
+            # --- Coerência entre datas: emissão, vencimento, desconto e juros ---
             # Segmento P - Data de vencimento: posições 78-85 (DDMMAAAA)
             # Segmento P - Data de emissão:   posições 110-117 (DDMMAAAA)
-            data_venc_raw = linha[77:85].strip() if len(linha) >= 85 else ""
-            data_emis_raw = linha[109:117].strip() if len(linha) >= 117 else ""
-
             dt_venc = _parse_data_ddmmaaaa(data_venc_raw)
             dt_emis = _parse_data_ddmmaaaa(data_emis_raw)
 
@@ -560,20 +560,7 @@ def validar_segmentos_avancados_bb(linhas):
                     "Verifique a coerência entre emissão e vencimento."
                 )
 
-            # Para as próximas regras, vamos buscar também data de desconto 1 e data de juros
-            data_desc1_raw = ""
-            cod_desc1 = ""
-            if len(linha) >= 150:
-                # Código do desconto 1: posição 142
-                # Data do desconto 1:   posições 143-150
-                cod_desc1 = linha[141:142].strip()
-                data_desc1_raw = linha[142:150].strip()
-
-            data_juros_raw = ""
-            if len(linha) >= 126:
-                # Data do juros de mora: posições 119-126 (C019)
-                data_juros_raw = linha[118:126].strip()
-
+            # Para as próximas regras, vamos usar também data de desconto 1 e data de juros
             dt_desc1 = _parse_data_ddmmaaaa(data_desc1_raw)
             dt_juros = _parse_data_ddmmaaaa(data_juros_raw)
 
@@ -596,24 +583,7 @@ def validar_segmentos_avancados_bb(linhas):
                     )
 
             # 3) Data de início dos juros de mora deve ser depois da data de vencimento
-            if dt_venc and dt_juros:
-                if dt_juros <= dt_venc:
-                    avisos.append(
-                        f"Linha {idx} (Lote {lote}, Seg. P): data de início dos juros de mora "
-                        f"({data_juros_raw}) deveria ser posterior à data de vencimento "
-                        f"({data_venc_raw}), conforme regras FEBRABAN. Verifique."
-                    )
-
-            if dt_venc and dt_desc1 and cod_desc1 == "3":
-                if dt_desc1 != dt_venc:
-                    avisos.append(
-                        f"Linha {idx} (Lote {lote}, Seg. P): para código de desconto '3', "
-                        f"a data do desconto ({data_desc1_raw}) deveria ser igual à data de vencimento "
-                        f"({data_venc_raw}). Verifique a configuração do desconto."
-                    )
-
-            # 3) Data de início dos juros de mora deve ser depois da data de vencimento
-            # (C019: Data do Juros de Mora > Data de Vencimento) 
+            # (C019: Data do Juros de Mora > Data de Vencimento)
             if dt_venc and dt_juros:
                 if dt_juros <= dt_venc:
                     avisos.append(
@@ -623,21 +593,19 @@ def validar_segmentos_avancados_bb(linhas):
                     )
 
         # ---------------- Segmento Q ----------------
-        if tipo_registro == "3" and segmento == "Q":
+        if tipo_registro == "3" and segmento in ("Q", "q"):
             lote = linha[3:7]
+            tipo_insc_raw, doc_raw, nome_raw, endereco_raw, cidade_raw, uf_raw, cep_raw = ler_campos_q(linha)
 
             # Tipo de inscrição e documento do sacado
             tipo_insc = None
             doc_sacado = ""
 
-            if cfg_tipo_insc and len(linha) >= cfg_tipo_insc["end"]:
-                s, e = cfg_tipo_insc["start"], cfg_tipo_insc["end"]
-                tipo_insc = linha[s:e].strip()
+            if pos_tipo_insc and tamanho >= pos_tipo_insc[1]:
+                tipo_insc = tipo_insc_raw.strip()
 
-            if cfg_doc_sac and len(linha) >= cfg_doc_sac["end"]:
-                s, e = cfg_doc_sac["start"], cfg_doc_sac["end"]
-                doc_raw = linha[s:e].strip()
-                doc_sacado = limpar_numero(doc_raw)
+            if pos_doc_sac and tamanho >= pos_doc_sac[1]:
+                doc_sacado = limpar_numero(doc_raw.strip())
 
             if tipo_insc in ("01", "02") and doc_sacado:
 
@@ -672,42 +640,37 @@ def validar_segmentos_avancados_bb(linhas):
                         )
 
             # Nome do sacado
-            if cfg_nome_sac and len(linha) >= cfg_nome_sac["end"]:
-                s, e = cfg_nome_sac["start"], cfg_nome_sac["end"]
-                nome = linha[s:e].strip()
+            if pos_nome_sac and tamanho >= pos_nome_sac[1]:
+                nome = nome_raw.strip()
                 if len(nome) < 3:
                     avisos.append(
                         f"Linha {idx} (Lote {lote}, Seg. Q): nome do sacado muito curto ('{nome}')."
                     )
 
             # Endereço, cidade, UF, CEP
-            if cfg_endereco and len(linha) >= cfg_endereco["end"]:
-                s, e = cfg_endereco["start"], cfg_endereco["end"]
-                endereco = linha[s:e].strip()
+            if pos_endereco and tamanho >= pos_endereco[1]:
+                endereco = endereco_raw.strip()
                 if not endereco:
                     avisos.append(
                         f"Linha {idx} (Lote {lote}, Seg. Q): endereço do sacado em branco."
                     )
 
-            if cfg_cidade and len(linha) >= cfg_cidade["end"]:
-                s, e = cfg_cidade["start"], cfg_cidade["end"]
-                cidade = linha[s:e].strip()
+            if pos_cidade and tamanho >= pos_cidade[1]:
+                cidade = cidade_raw.strip()
                 if not cidade:
                     avisos.append(
                         f"Linha {idx} (Lote {lote}, Seg. Q): cidade do sacado em branco."
                     )
 
-            if cfg_uf and len(linha) >= cfg_uf["end"]:
-                s, e = cfg_uf["start"], cfg_uf["end"]
-                uf = linha[s:e].strip().upper()
-                if uf and uf not in ufs_validas:
+            if pos_uf and tamanho >= pos_uf[1]:
+                uf = uf_raw.strip().upper()
+                if uf and uf not in ESTADOS_BR:
                     avisos.append(
                         f"Linha {idx} (Lote {lote}, Seg. Q): UF do sacado '{uf}' não é um estado brasileiro válido."
                     )
 
-            if cfg_cep and len(linha) >= cfg_cep["end"]:
-                s, e = cfg_cep["start"], cfg_cep["end"]
-                cep = linha[s:e].strip()
+            if pos_cep and tamanho >= pos_cep[1]:
+                cep = cep_raw.strip()
                 cep_num = limpar_numero(cep)
                 if not cep_num or len(cep_num) != 8:
                     avisos.append(
@@ -715,11 +678,11 @@ def validar_segmentos_avancados_bb(linhas):
                     )
         
             # ---------------- Segmento R ----------------
-            elif segmento == "R":
+            elif segmento in ("R", "r"):
                 lote = linha[3:7]
 
                 # Só faz sentido validar se tiver pelo menos até os campos de multa
-                if len(linha) < 90:
+                if tamanho < 90:
                     continue
 
                 # ===================== DESCONTO 2 =====================
@@ -751,7 +714,7 @@ def validar_segmentos_avancados_bb(linhas):
                             f"Linha {idx} (Lote {lote}, Seg. R): código de Desconto 2 '{cod_desc2}' informado, "
                             f"mas o valor do desconto 2 '{valor_desc2_raw}' não é numérico."
                         )
-                    elif int(valor_desc2_raw) == 0:
+                    elif not valor_desc2_raw.strip("0"):
                         avisos.append(
                             f"Linha {idx} (Lote {lote}, Seg. R): código de Desconto 2 '{cod_desc2}' informado, "
                             "mas o valor do desconto 2 está zerado. Verifique se o campo foi preenchido corretamente."
@@ -794,7 +757,7 @@ def validar_segmentos_avancados_bb(linhas):
                             f"Linha {idx} (Lote {lote}, Seg. R): código de Desconto 3 '{cod_desc3}' informado, "
                             f"mas o valor do desconto 3 '{valor_desc3_raw}' não é numérico."
                         )
-                    elif int(valor_desc3_raw) == 0:
+                    elif not valor_desc3_raw.strip("0"):
                         avisos.append(
                             f"Linha {idx} (Lote {lote}, Seg. R): código de Desconto 3 '{cod_desc3}' informado, "
                             "mas o valor do desconto 3 está zerado. Verifique se o campo foi preenchido corretamente."
@@ -837,7 +800,7 @@ def validar_segmentos_avancados_bb(linhas):
                             f"Linha {idx} (Lote {lote}, Seg. R): código de multa '{cod_multa}' informado, "
                             f"mas o valor/percentual da multa '{valor_multa_raw}' não é numérico."
                         )
-                    elif int(valor_multa_raw) == 0:
+                    elif not valor_multa_raw.strip("0"):
                         avisos.append(
                             f"Linha {idx} (Lote {lote}, Seg. R): código de multa '{cod_multa}' informado, "
                             "mas o valor/percentual da multa está zerado. Verifique se o campo foi preenchido corretamente."
@@ -854,9 +817,9 @@ def validar_segmentos_avancados_bb(linhas):
 
                 # ===================== DÉBITO AUTOMÁTICO (opcional) =====================
                 # Se qualquer campo de débito estiver preenchido, checa consistência básica
-                banco_deb = linha[207:210].strip() if len(linha) >= 210 else ""
-                ag_deb = linha[210:215].strip() if len(linha) >= 215 else ""
-                conta_deb = linha[216:228].strip() if len(linha) >= 228 else ""
+                banco_deb = linha[207:210].strip() if tamanho >= 210 else ""
+                ag_deb = linha[210:215].strip() if tamanho >= 215 else ""
+                conta_deb = linha[216:228].strip() if tamanho >= 228 else ""
 
                 if banco_deb or ag_deb or conta_deb:
                     # Se usou débito, pelo menos banco e agência/conta devem ser numéricos
@@ -873,20 +836,5 @@ def validar_segmentos_avancados_bb(linhas):
                             f"Linha {idx} (Lote {lote}, Seg. R): conta corrente para débito automático '{conta_deb}' não é numérica."
                         )
 
-        
-    for idx, linha in enumerate(linhas, start=1):
-      l = linha.rstrip("\r\n")
-      if len(l) < 20:
-        continue
-
-      tipo_registro = l[7:8]
-      if tipo_registro == "3":
-        segmento = l[13:14]
-
-        if segmento == "P":
-            lote = l[3:7]
-
-            # ... várias validações aqui (vencimento, valor, nosso número, juros, desconto, protesto/baixa etc)
-
 
     return erros, avisos
@@ -1,9 +1,26 @@
 """Rotinas comuns do CNAB 240."""
 
+from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
 from ..base import ESTADOS_BR, limpar_numero
 from ..cnab400.utils import _campo_cnab400
 
+# Tipos de registro previstos na FEBRABAN (alguns bancos nem usam todos)
+TIPOS_REGISTRO_CNAB240 = frozenset({"0", "1", "2", "3", "4", "5", "9"})
+_TIPOS_REGISTRO_CNAB240_ORDENADOS = sorted(TIPOS_REGISTRO_CNAB240)
+
+@dataclass(slots=True)
+class _InfoLote:
+    """Acumuladores de um lote (estrutura e quantidade de registros do lote)."""
+
+    qtd_registros: int = 0
+    header: bool = False
+    tem_detalhe: bool = False
+    trailer: tuple = None  # (idx, linha) do último trailer de lote (tipo 5)
+
 def validar_estrutura_basica_cnab240(linhas):
     """
     Faz validações gerais de estrutura para CNAB 240:
@@ -42,9 +59,6 @@ def validar_estrutura_basica_cnab240(linhas):
         )
 
     # Validação dos tipos de registro em todas as linhas
-    tipos_validos = {"0", "1", "2", "3", "4", "5", "9"}
-    # OBS: alguns bancos nem usam todos, mas esses são os previstos na FEBRABAN
-
     for i, linha in enumerate(linhas, start=1):
         if linha.strip() == "":
             continue  # ignora linha totalmente em branco
@@ -55,10 +69,10 @@ def validar_estrutura_basica_cnab240(linhas):
             continue
 
         tipo_registro = linha[7:8]
-        if tipo_registro not in tipos_validos:
+        if tipo_registro not in TIPOS_REGISTRO_CNAB240:
             erros.append(
                 f"Linha {i}: tipo de registro '{tipo_registro}' inválido "
-                f"(esperado um de {sorted(tipos_validos)})."
+                f"(esperado um de {_TIPOS_REGISTRO_CNAB240_ORDENADOS})."
             )
 
     return erros
@@ -68,9 +82,14 @@ def validar_codigo_banco_consistente(linhas, codigo_banco_esperado):
     Verifica se todas as linhas têm o mesmo código de banco do header (posições 1 a 3).
     """
     erros = []
+    # Com o código esperado de 3 posições, startswith equivale a comparar linha[0:3]
+    # sem criar a fatia; a fatia só é montada para a mensagem de erro
+    prefixo = codigo_banco_esperado if len(codigo_banco_esperado) == 3 else None
     for i, linha in enumerate(linhas, start=1):
         if linha.strip() == "":
             continue
+        if prefixo is not None and linha.startswith(prefixo):
+            continue
         codigo = linha[0:3]
         if codigo != codigo_banco_esperado:
             erros.append(
@@ -93,7 +112,7 @@ def validar_lotes_cnab240(linhas):
     """
     erros = []
 
-    lotes = {}  # {numero_lote: {"header": False, "trailer": False, "tem_detalhe": False}}
+    lotes = {}  # {numero_lote: _InfoLote}
 
     for i, linha in enumerate(linhas, start=1):
         if linha.strip() == "":
@@ -110,26 +129,23 @@ def validar_lotes_cnab240(linhas):
         if tipo in {"0", "9"}:
             continue
 
-        if numero_lote not in lotes:
-            lotes[numero_lote] = {
-                "header": False,
-                "trailer": False,
-                "tem_detalhe": False,
-            }
+        info = lotes.get(numero_lote)
+        if info is None:
+            info = lotes[numero_lote] = _InfoLote()
 
         if tipo == "1":
-            lotes[numero_lote]["header"] = True
+            info.header = True
         elif tipo == "5":
-            lotes[numero_lote]["trailer"] = True
+            info.trailer = (i, linha.rstrip("\n\r"))
         elif tipo == "3":
-            lotes[numero_lote]["tem_detalhe"] = True
+            info.tem_detalhe = True
 
     for numero_lote, info in lotes.items():
-        if not info["header"]:
+        if not info.header:
             erros.append(f"Lote {numero_lote}: não possui Header de Lote (tipo 1).")
-        if not info["trailer"]:
+        if info.trailer is None:
             erros.append(f"Lote {numero_lote}: não possui Trailer de Lote (tipo 5).")
-        if not info["tem_detalhe"]:
+        if not info.tem_detalhe:
             erros.append(
                 f"Lote {numero_lote}: não possui registros de detalhe (tipo 3)."
             )
@@ -148,7 +164,7 @@ def validar_qtd_registros_lote_cnab240(linhas):
 
     erros = []
 
-    # Mapa de lotes: lote -> { "linhas_idx": [números de linha], "trailer": (idx, linha) }
+    # Mapa de lotes: lote -> _InfoLote (quantidade de linhas e trailer (idx, linha))
     lotes = {}
 
     for idx, linha in enumerate(linhas, start=1):
@@ -166,16 +182,18 @@ def validar_qtd_registros_lote_cnab240(linhas):
         if lote.strip() == "" or tipo in ("0", "9"):
             continue
 
-        info = lotes.setdefault(lote, {"linhas_idx": [], "trailer": None})
-        info["linhas_idx"].append(idx)
+        info = lotes.get(lote)
+        if info is None:
+            info = lotes[lote] = _InfoLote()
+        info.qtd_registros += 1
 
         # Trailer de lote: tipo de registro = '5'
         if tipo == "5":
-            info["trailer"] = (idx, l)
+            info.trailer = (idx, l)
 
     # Agora conferimos cada lote que tem trailer
     for lote, info in lotes.items():
-        trailer = info["trailer"]
+        trailer = info.trailer
         if not trailer:
             # Já deve ser apontado em outras validações (estrutura de lotes), então aqui só ignoramos
             continue
@@ -202,7 +220,7 @@ def validar_qtd_registros_lote_cnab240(linhas):
         qtd_trailer = int(qtd_str)
 
         # Quantidade real de linhas pertencentes ao lote
-        qtd_real = len(info["linhas_idx"])
+        qtd_real = info.qtd_registros
 
         if qtd_real != qtd_trailer:
             erros.append(
@@ -229,18 +247,22 @@ def validar_totais_arquivo_cnab240(linhas):
     if not linhas:
         return erros
 
-    # Localiza o trailer de arquivo (tipo de registro = '9' na posição 8)
+    # Numa só passada: localiza o trailer de arquivo (primeiro registro tipo '9'
+    # na posição 8 com ao menos 29 posições) e conta os lotes reais do arquivo
+    # (registros tipo 1 na posição 8)
     trailer = None
     idx_trailer = None
+    qtd_lotes_real = 0
     for idx, linha in enumerate(linhas, start=1):
         l = linha.rstrip("\r\n")
-        if len(l) < 29:
+        if len(l) < 8:
             continue
         tipo = l[7:8]
-        if tipo == "9":
+        if tipo == "1":
+            qtd_lotes_real += 1
+        elif tipo == "9" and trailer is None and len(l) >= 29:
             trailer = l
             idx_trailer = idx
-            break
 
     if trailer is None:
         # Se não há trailer, a validação básica de estrutura já deveria acusar isso.
@@ -265,16 +287,6 @@ def validar_totais_arquivo_cnab240(linhas):
     qtd_lotes_trailer = int(qtd_lotes_str)
     qtd_regs_trailer = int(qtd_regs_str)
 
-    # Conta lotes reais no arquivo (registros tipo 1 na posição 8)
-    qtd_lotes_real = 0
-    for linha in linhas:
-        l = linha.rstrip("\r\n")
-        if len(l) < 8:
-            continue
-        tipo = l[7:8]
-        if tipo == "1":
-            qtd_lotes_real += 1
-
     # Quantidade real de registros do arquivo = total de linhas
     qtd_regs_real = len(linhas)
 
@@ -355,6 +367,212 @@ def validar_sequencia_registros_lote(linhas):
 
     return erros
 
+# Campos de controle de um registro CNAB 240, lidos numa só chamada:
+# lote (pos. 4-7), tipo de registro (pos. 8) e sequencial no lote (pos. 9-13)
+_CAMPOS_CONTROLE_CNAB240 = itemgetter(slice(3, 7), slice(7, 8), slice(8, 13))
+
+def validar_registros_cnab240(linhas, codigo_banco_esperado):
+    """
+    Executa, numa única passada sobre as linhas, as mesmas verificações de:
+    - validar_estrutura_basica_cnab240
+    - validar_totais_arquivo_cnab240
+    - validar_codigo_banco_consistente
+    - validar_lotes_cnab240
+    - validar_qtd_registros_lote_cnab240
+    - validar_sequencia_registros_lote
+
+    Retorna dicionário com a lista de erros de cada uma (chaves "estrutura",
+    "totais", "banco", "lotes", "lotes_qtd" e "sequencia"), com as mesmas
+    mensagens e na mesma ordem das funções individuais.
+
+    ``linhas`` pode ser qualquer iterável de linhas (lista, arquivo aberto em
+    modo texto...): as linhas são lidas uma única vez e não precisam estar
+    todas em memória.
+    """
+    erros_estrutura = []
+    erros_banco = []
+    erros_lotes = []
+    erros_sequencia = []
+
+    # Ver validar_codigo_banco_consistente
+    prefixo_banco = codigo_banco_esperado if len(codigo_banco_esperado) == 3 else None
+    primeira_linha = None
+    ultima_linha = None  # (idx, linha) da última linha não vazia
+    qtd_linhas = 0
+    lotes = {}  # {numero_lote: _InfoLote}
+    trailer_arquivo = None  # (idx, linha) do primeiro registro tipo 9 com 29+ posições
+    qtd_lotes_real = 0
+    registros_por_lote = {}  # {numero_lote: [(seq, linha_idx), ...]}
+
+    for i, linha in enumerate(linhas, start=1):
+        if primeira_linha is None:
+            primeira_linha = linha
+        qtd_linhas = i
+        l = linha.rstrip("\r\n")
+        tamanho = len(l)
+        lote, tipo, seq_str = _CAMPOS_CONTROLE_CNAB240(l)
+
+        # Totais do arquivo (também consideram linhas em branco)
+        if tamanho >= 8:
+            if tipo == "1":
+                qtd_lotes_real += 1
+            if trailer_arquivo is None and tipo == "9" and tamanho >= 29:
+                trailer_arquivo = (i, l)
+
+        if linha.strip() == "":
+            continue
+        ultima_linha = (i, linha)
+
+        if prefixo_banco is None or not linha.startswith(prefixo_banco):
+            codigo = linha[0:3]
+            if codigo != codigo_banco_esperado:
+                erros_banco.append(
+                    f"Linha {i}: código do banco '{codigo}' diferente do header "
+                    f"'{codigo_banco_esperado}'."
+                )
+
+        if tamanho < 8:
+            erros_estrutura.append(
+                f"Linha {i}: muito curta para ler o tipo de registro (menos de 8 caracteres)."
+            )
+            erros_lotes.append(f"Linha {i}: muito curta para ler lote/tipo de registro.")
+            continue
+
+        if tipo not in TIPOS_REGISTRO_CNAB240:
+            erros_estrutura.append(
+                f"Linha {i}: tipo de registro '{tipo}' inválido "
+                f"(esperado um de {_TIPOS_REGISTRO_CNAB240_ORDENADOS})."
+            )
+
+        if tipo not in {"0", "9"}:
+            info = lotes.get(lote)
+            if info is None:
+                info = lotes[lote] = _InfoLote()
+            info.qtd_registros += 1
+            if tipo == "1":
+                info.header = True
+            elif tipo == "5":
+                info.trailer = (i, l)
+            elif tipo == "3":
+                info.tem_detalhe = True
+
+        if tipo == "3" and tamanho >= 13:
+            if not seq_str.isdigit():
+                erros_sequencia.append(
+                    f"Linha {i}: no lote {lote}, número sequencial "
+                    f"'{seq_str}' não é numérico (tipo de registro {tipo})."
+                )
+            else:
+                registros_por_lote.setdefault(lote, []).append((int(seq_str), i))
+
+    # Estrutura básica: header (primeira linha) e trailer (última linha não vazia)
+    cabecalho = []
+    tipo_header = (primeira_linha or "").rstrip("\n\r")[7:8]
+    if tipo_header != "0":
+        cabecalho.append(
+            "Header de arquivo inválido: tipo de registro na linha 1 é "
+            f"'{tipo_header}', esperado '0'."
+        )
+    if ultima_linha is None:
+        cabecalho.append("Arquivo não possui linhas válidas (todas em branco).")
+    else:
+        idx_ultima, linha_ultima = ultima_linha
+        tipo_trailer = linha_ultima.rstrip("\n\r")[7:8]
+        if tipo_trailer != "9":
+            cabecalho.append(
+                "Trailer de arquivo inválido: tipo de registro na linha "
+                f"{idx_ultima} é '{tipo_trailer}', esperado '9'."
+            )
+    erros_estrutura[:0] = cabecalho
+
+    # Estrutura de lotes
+    for numero_lote, info in lotes.items():
+        if not info.header:
+            erros_lotes.append(f"Lote {numero_lote}: não possui Header de Lote (tipo 1).")
+        if info.trailer is None:
+            erros_lotes.append(f"Lote {numero_lote}: não possui Trailer de Lote (tipo 5).")
+        if not info.tem_detalhe:
+            erros_lotes.append(
+                f"Lote {numero_lote}: não possui registros de detalhe (tipo 3)."
+            )
+
+    # Quantidade de registros informada no trailer de cada lote (lotes com
+    # número em branco ficam de fora, como em validar_qtd_registros_lote_cnab240)
+    erros_lotes_qtd = []
+    for lote, info in lotes.items():
+        if info.trailer is None or lote.strip() == "":
+            continue
+        qtd_real = info.qtd_registros
+        idx_trailer, l = info.trailer
+        if len(l) < 23:
+            erros_lotes_qtd.append(
+                f"Lote {lote}: trailer (linha {idx_trailer}) muito curto para conter a quantidade de registros "
+                "nas posições 18-23."
+            )
+            continue
+        qtd_str = l[17:23]
+        if not qtd_str.isdigit():
+            erros_lotes_qtd.append(
+                f"Lote {lote}: quantidade de registros no trailer (linha {idx_trailer}) "
+                f"'{qtd_str}' não é numérica."
+            )
+            continue
+        qtd_trailer = int(qtd_str)
+        if qtd_real != qtd_trailer:
+            erros_lotes_qtd.append(
+                f"Lote {lote}: quantidade de registros informada no trailer ({qtd_trailer}) "
+                f"é diferente da quantidade real de linhas do lote ({qtd_real})."
+            )
+
+    # Totais do trailer de arquivo
+    erros_totais = []
+    if trailer_arquivo is not None:
+        idx_trailer, trailer = trailer_arquivo
+        qtd_lotes_str = trailer[17:23]
+        qtd_regs_str = trailer[23:29]
+        if not qtd_lotes_str.isdigit():
+            erros_totais.append(
+                f"Trailer de arquivo (linha {idx_trailer}): quantidade de lotes '{qtd_lotes_str}' não é numérica."
+            )
+        elif not qtd_regs_str.isdigit():
+            erros_totais.append(
+                f"Trailer de arquivo (linha {idx_trailer}): quantidade de registros '{qtd_regs_str}' não é numérica."
+            )
+        else:
+            qtd_lotes_trailer = int(qtd_lotes_str)
+            qtd_regs_trailer = int(qtd_regs_str)
+            if qtd_lotes_real != qtd_lotes_trailer:
+                erros_totais.append(
+                    f"Trailer de arquivo: quantidade de lotes informada ({qtd_lotes_trailer}) "
+                    f"é diferente da quantidade real de lotes ({qtd_lotes_real})."
+                )
+            if qtd_linhas != qtd_regs_trailer:
+                erros_totais.append(
+                    f"Trailer de arquivo: quantidade de registros informada ({qtd_regs_trailer}) "
+                    f"é diferente da quantidade real de registros ({qtd_linhas})."
+                )
+
+    # Sequência crescente de 1 em 1 dentro de cada lote
+    for numero_lote, registros in registros_por_lote.items():
+        prev_seq = registros[0][0]
+        for seq, linha_idx in registros[1:]:
+            esperado = prev_seq + 1
+            if seq != esperado:
+                erros_sequencia.append(
+                    f"Linha {linha_idx}: no lote {numero_lote}, número sequencial é "
+                    f"{seq}, esperado {esperado}."
+                )
+            prev_seq = seq
+
+    return {
+        "estrutura": erros_estrutura,
+        "totais": erros_totais,
+        "banco": erros_banco,
+        "lotes": erros_lotes,
+        "lotes_qtd": erros_lotes_qtd,
+        "sequencia": erros_sequencia,
+    }
+
 LAYOUT_CNAB240_COMUM_PQ = {
     "P": {
         "nosso_numero": {
@@ -460,6 +678,42 @@ LAYOUTS_CNAB240 = {
     "748": LAYOUT_CNAB240_COMUM_PQ,
 }
 
+@lru_cache(maxsize=32)
+def _campos_segmentos_compilados(codigo_banco):
+    """
+    Specs dos campos do layout do banco (LAYOUTS_CNAB240) "achatadas" em tuplas,
+    por segmento, para o laço de validar_segmentos_por_layout. Fica em cache por
+    banco; se LAYOUTS_CNAB240 for alterado em tempo de execução, chame
+    ``_campos_segmentos_compilados.cache_clear()``.
+
+    Cada segmento também fica acessível pela letra minúscula, para o laço
+    consultar linha[13:14] direto, sem upper() a cada linha.
+    """
+    por_segmento = {
+        segmento: tuple(
+            (
+                nome_campo,
+                spec["start"],
+                spec["end"],
+                spec["type"],
+                spec.get("required", False),
+                f"(Segmento {segmento} - {nome_campo})",
+                f"(posições {spec['start'] + 1}-{spec['end']})",
+                spec.get("no_all_zeros"),
+                spec.get("min_len", 0),
+                spec.get("allowed", []),
+            )
+            for nome_campo, spec in campos.items()
+        )
+        for segmento, campos in LAYOUTS_CNAB240[codigo_banco].items()
+    }
+    return {
+        chave: campos
+        for segmento, campos in por_segmento.items()
+        if segmento == segmento.upper()
+        for chave in (segmento, segmento.lower())
+    }
+
 def validar_segmentos_por_layout(codigo_banco, linhas):
     """
     Valida Segmentos (P, Q, etc.) com base no LAYOUTS_CNAB240.
@@ -468,13 +722,14 @@ def validar_segmentos_por_layout(codigo_banco, linhas):
     erros = []
     avisos = []
 
-    layout_banco = LAYOUTS_CNAB240.get(codigo_banco)
-    if not layout_banco:
+    if not LAYOUTS_CNAB240.get(codigo_banco):
         avisos.append(
             f"Não há layout de segmentos configurado para o banco {codigo_banco}."
         )
         return erros, avisos
 
+    campos_por_segmento = _campos_segmentos_compilados(codigo_banco)
+
     for numero_linha, linha in enumerate(linhas, start=1):
         if linha.strip() == "":
             continue
@@ -487,101 +742,94 @@ def validar_segmentos_por_layout(codigo_banco, linhas):
         if tipo_registro != "3":
             continue
 
-        segmento = linha[13:14].upper()
-        if segmento not in layout_banco:
+        campos = campos_por_segmento.get(linha[13:14])
+        if campos is None:
             continue
 
-        campos = layout_banco[segmento]
-
-        for nome_campo, spec in campos.items():
-            start = spec["start"]
-            end = spec["end"]
+        for (
+            nome_campo, start, end, tipo, required, rotulo, pos_str,
+            no_all_zeros, min_len, allowed,
+        ) in campos:
             raw = linha[start:end]
             valor = raw.strip()
-            label = f"Linha {numero_linha} (Segmento {segmento} - {nome_campo})"
-            pos_str = f"(posições {start + 1}-{end})"
-            required = spec.get("required", False)
 
             # Obrigatório em branco
             if not valor:
                 if required:
-                    erros.append(f"{label}: campo obrigatório em branco {pos_str}.")
+                    erros.append(f"Linha {numero_linha} {rotulo}: campo obrigatório em branco {pos_str}.")
                 continue
 
-            tipo = spec["type"]
+            # Tipos mutuamente exclusivos; "texto" vem primeiro por ser o mais
+            # frequente nos layouts cadastrados (nome, endereço, bairro, cidade...)
+            if tipo == "texto":
+                if len(valor) < min_len:
+                    avisos.append(
+                        f"Linha {numero_linha} {rotulo}: texto muito curto (tamanho {len(valor)}, "
+                        f"mínimo {min_len}) {pos_str}."
+                    )
 
-            if tipo == "numero":
+            elif tipo == "numero":
                 if not valor.isdigit():
                     erros.append(
-                        f"{label}: valor '{raw}' contém caracteres não numéricos {pos_str}."
+                        f"Linha {numero_linha} {rotulo}: valor '{raw}' contém caracteres não numéricos {pos_str}."
                     )
-                elif spec.get("no_all_zeros") and set(valor) == {"0"}:
+                elif no_all_zeros and not valor.strip("0"):
                     erros.append(
-                        f"{label}: valor não pode ser composto apenas por zeros {pos_str}."
+                        f"Linha {numero_linha} {rotulo}: valor não pode ser composto apenas por zeros {pos_str}."
                     )
 
             elif tipo == "alfanumerico":
                 if not valor.isalnum():
                     avisos.append(
-                        f"{label}: valor '{valor}' contém caracteres não alfanuméricos {pos_str}."
-                    )
-
-            elif tipo == "texto":
-                min_len = spec.get("min_len", 0)
-                if len(valor) < min_len:
-                    avisos.append(
-                        f"{label}: texto muito curto (tamanho {len(valor)}, "
-                        f"mínimo {min_len}) {pos_str}."
+                        f"Linha {numero_linha} {rotulo}: valor '{valor}' contém caracteres não alfanuméricos {pos_str}."
                     )
 
             elif tipo == "lista":
-                allowed = spec.get("allowed", [])
                 if valor not in allowed:
                     erros.append(
-                        f"{label}: valor '{valor}' inválido (esperado um de {allowed}) {pos_str}."
+                        f"Linha {numero_linha} {rotulo}: valor '{valor}' inválido (esperado um de {allowed}) {pos_str}."
                     )
 
             elif tipo == "data_ddmmaaaa":
                 if len(valor) != 8 or not valor.isdigit():
                     erros.append(
-                        f"{label}: data '{raw}' com formato inválido "
+                        f"Linha {numero_linha} {rotulo}: data '{raw}' com formato inválido "
                         f"(esperado DDMMAAAA numérico) {pos_str}."
                     )
                 else:
-                    dia = int(valor[0:2])
-                    mes = int(valor[2:4])
-                    ano = int(valor[4:8])
+                    # Um único int() para os 8 dígitos; dia/mês/ano saem por divmod
+                    dia, mes_ano = divmod(int(valor), 1000000)
+                    mes, ano = divmod(mes_ano, 10000)
                     if not (1 <= dia <= 31 and 1 <= mes <= 12 and 1900 <= ano <= 2099):
                         erros.append(
-                            f"{label}: data '{valor}' fora de faixa válida {pos_str}."
+                            f"Linha {numero_linha} {rotulo}: data '{valor}' fora de faixa válida {pos_str}."
                         )
 
             elif tipo == "valor":
                 if not valor.isdigit():
                     erros.append(
-                        f"{label}: valor '{raw}' não é numérico {pos_str}."
+                        f"Linha {numero_linha} {rotulo}: valor '{raw}' não é numérico {pos_str}."
+                    )
+                elif not valor.strip("0"):
+                    # Só dígitos: é zero quando só há '0' (sem converter em int)
+                    erros.append(
+                        f"Linha {numero_linha} {rotulo}: valor deve ser maior que zero {pos_str}."
                     )
-                else:
-                    centavos = int(valor)
-                    if centavos <= 0:
-                        erros.append(
-                            f"{label}: valor deve ser maior que zero {pos_str}."
-                        )
 
             elif tipo == "cep":
                 if not valor.isdigit() or len(valor) != 8:
                     erros.append(
-                        f"{label}: CEP '{raw}' inválido (esperado 8 dígitos) {pos_str}."
+                        f"Linha {numero_linha} {rotulo}: CEP '{raw}' inválido (esperado 8 dígitos) {pos_str}."
                     )
                 elif valor == "00000000":
                     erros.append(
-                        f"{label}: CEP não pode ser '00000000' {pos_str}."
+                        f"Linha {numero_linha} {rotulo}: CEP não pode ser '00000000' {pos_str}."
                     )
 
             elif tipo == "uf":
                 if valor not in ESTADOS_BR:
                     erros.append(
-                        f"{label}: UF '{raw}' inválida (não é um estado brasileiro conhecido) {pos_str}."
+                        f"Linha {numero_linha} {rotulo}: UF '{raw}' inválida (não é um estado brasileiro conhecido) {pos_str}."
                     )
 
     return erros, avisos
@@ -658,7 +906,7 @@ def validar_dados_cedente_vs_arquivo(codigo_banco: str, linhas, dados_conta, lay
 
         # Procurar primeiro header de lote (tipo de registro = '1')
         header_lote = None
-        for linha in linhas[1:]:
+        for linha in islice(linhas, 1, None):
             linha_limpa = linha.rstrip("\r\n")
             if len(linha_limpa) >= 8 and linha_limpa[7:8] == "1":
                 header_lote = linha_limpa
@@ -757,7 +1005,44 @@ def validar_dados_cedente_vs_arquivo(codigo_banco: str, linhas, dados_conta, lay
 
     return erros, avisos
 
-def gerar_resumo_remessa_cnab240(codigo_banco: str, linhas):
+@lru_cache(maxsize=4096)
+def _ler_data_ddmmaaaa(valor, faixa=True):
+    """
+    Converte uma data DDMMAAAA (8 dígitos) em datetime; None se vazia, mal
+    formada ou inexistente. Com ``faixa``, também exige dia 1-31, mês 1-12 e
+    ano 1900-2099. Em cache: numa remessa os mesmos vencimentos se repetem muito.
+    """
+    if len(valor) != 8 or not valor.isdigit():
+        return None
+    dia, mes_ano = divmod(int(valor), 1000000)
+    mes, ano = divmod(mes_ano, 10000)
+    if faixa and not (1 <= dia <= 31 and 1 <= mes <= 12 and 1900 <= ano <= 2099):
+        return None
+    try:
+        return datetime(ano, mes, dia)
+    except ValueError:
+        return None
+
+@lru_cache(maxsize=4096)
+def _formatar_data_ddmmaaaa(valor, faixa=True):
+    """Data DDMMAAAA como 'dd/mm/aaaa' (ver _ler_data_ddmmaaaa); None se inválida."""
+    dt = _ler_data_ddmmaaaa(valor, faixa)
+    return dt.strftime("%d/%m/%Y") if dt else None
+
+def indexar_segmentos_p_cnab240(linhas):
+    """
+    Índices (base 0) das linhas de Segmento P (registro tipo 3, segmento 'P'),
+    na ordem do arquivo. Calculado uma vez e repassado a
+    gerar_resumo_remessa_cnab240 e listar_titulos_cnab240, evita que cada uma
+    classifique de novo todas as linhas do arquivo.
+    """
+    return [
+        idx
+        for idx, linha in enumerate(linhas)
+        if linha[7:8] == "3" and linha[13:14] in ("P", "p")
+    ]
+
+def gerar_resumo_remessa_cnab240(codigo_banco: str, linhas, indices_p=None):
     """
     Gera um resumo da remessa com base nos Segmentos P:
     - quantidade de títulos
@@ -765,6 +1050,8 @@ def gerar_resumo_remessa_cnab240(codigo_banco: str, linhas):
     - menor e maior vencimento
 
     Por enquanto implementado usando o layout configurado para o banco 001 (Banco do Brasil).
+
+    ``indices_p`` (opcional) é o resultado de indexar_segmentos_p_cnab240(linhas).
     """
     resumo = {
         "qtd_titulos": 0,
@@ -789,32 +1076,24 @@ def gerar_resumo_remessa_cnab240(codigo_banco: str, linhas):
     end_venc = cfg_venc["end"]
     start_valor = cfg_valor["start"]
     end_valor = cfg_valor["end"]
+    tamanho_minimo = max(end_venc, end_valor, 14)
 
-    for linha in linhas:
-        if linha.strip() == "":
-            continue
-        linha = linha.rstrip("\r\n")
-        if len(linha) < max(end_venc, end_valor, 14):
-            continue
+    # Acumuladores em variáveis locais; o dicionário do resumo só é preenchido no fim
+    qtd_titulos = 0
+    valor_total_centavos = 0
+    vencimento_min = None
+    vencimento_max = None
 
-        tipo_registro = linha[7:8]
-        segmento = linha[13:14].upper()
+    if indices_p is None:
+        indices_p = indexar_segmentos_p_cnab240(linhas)
 
-        if tipo_registro != "3" or segmento != "P":
+    for idx in indices_p:
+        linha = linhas[idx].rstrip("\r\n")
+        if len(linha) < tamanho_minimo:
             continue
 
         # Data de vencimento
-        data_raw = linha[start_venc:end_venc].strip()
-        dt = None
-        if len(data_raw) == 8 and data_raw.isdigit():
-            dia = int(data_raw[0:2])
-            mes = int(data_raw[2:4])
-            ano = int(data_raw[4:8])
-            try:
-                if 1 <= dia <= 31 and 1 <= mes <= 12 and 1900 <= ano <= 2099:
-                    dt = datetime(ano, mes, dia)
-            except ValueError:
-                dt = None
+        dt = _ler_data_ddmmaaaa(linha[start_venc:end_venc].strip())
 
         # Valor
         valor_raw = linha[start_valor:end_valor].strip()
@@ -824,21 +1103,37 @@ def gerar_resumo_remessa_cnab240(codigo_banco: str, linhas):
             valor_cent = 0  # se estiver inválido, ignora neste resumo
 
         # Atualiza resumo
-        resumo["qtd_titulos"] += 1
-        resumo["valor_total_centavos"] += valor_cent
+        qtd_titulos += 1
+        valor_total_centavos += valor_cent
 
         if dt:
-            if resumo["vencimento_min"] is None or dt < resumo["vencimento_min"]:
-                resumo["vencimento_min"] = dt
-            if resumo["vencimento_max"] is None or dt > resumo["vencimento_max"]:
-                resumo["vencimento_max"] = dt
+            if vencimento_min is None or dt < vencimento_min:
+                vencimento_min = dt
+            if vencimento_max is None or dt > vencimento_max:
+                vencimento_max = dt
+
+    resumo["qtd_titulos"] = qtd_titulos
+    resumo["valor_total_centavos"] = valor_total_centavos
+    resumo["vencimento_min"] = vencimento_min
+    resumo["vencimento_max"] = vencimento_max
 
     # Calcula valor em reais
-    resumo["valor_total_reais"] = resumo["valor_total_centavos"] / 100.0
+    resumo["valor_total_reais"] = valor_total_centavos / 100.0
 
     return resumo
 
-def listar_titulos_cnab240(codigo_banco: str, linhas):
+# Campos do Segmento Q usados na lista de títulos, na ordem em que são lidos
+_CAMPOS_SACADO_Q = (
+    "documento_sacado",
+    "nome_sacado",
+    "endereco_sacado",
+    "bairro_sacado",
+    "cep_sacado",
+    "cidade_sacado",
+    "uf_sacado",
+)
+
+def listar_titulos_cnab240(codigo_banco: str, linhas, indices_p=None):
     """
     Retorna uma lista de títulos encontrados na remessa CNAB 240 para o banco informado.
 
@@ -852,6 +1147,8 @@ def listar_titulos_cnab240(codigo_banco: str, linhas):
       - sacado_documento
       - sacado_nome
       - sacado_endereco / bairro / cidade / UF / CEP
+
+    ``indices_p`` (opcional) é o resultado de indexar_segmentos_p_cnab240(linhas).
     """
 
     titulos = []
@@ -877,52 +1174,23 @@ def listar_titulos_cnab240(codigo_banco: str, linhas):
     start_venc, end_venc = cfg_venc["start"], cfg_venc["end"]
     start_valor, end_valor = cfg_valor["start"], cfg_valor["end"]
 
-    # Campos do sacado (Segmento Q) — inicialização
-    start_doc_sacado = end_doc_sacado = None
-    start_nome_sacado = end_nome_sacado = None
-    start_endereco = end_endereco = None
-    start_bairro = end_bairro = None
-    start_cep = end_cep = None
-    start_cidade = end_cidade = None
-    start_uf = end_uf = None
-
-    if campos_q:
-        cfg_doc_sac = campos_q.get("documento_sacado")
-        cfg_nome_sac = campos_q.get("nome_sacado")
-        cfg_endereco = campos_q.get("endereco_sacado")
-        cfg_bairro = campos_q.get("bairro_sacado")
-        cfg_cep = campos_q.get("cep_sacado")
-        cfg_cidade = campos_q.get("cidade_sacado")
-        cfg_uf = campos_q.get("uf_sacado")
-
-        if cfg_doc_sac:
-            start_doc_sacado, end_doc_sacado = cfg_doc_sac["start"], cfg_doc_sac["end"]
-        if cfg_nome_sac:
-            start_nome_sacado, end_nome_sacado = cfg_nome_sac["start"], cfg_nome_sac["end"]
-        if cfg_endereco:
-            start_endereco, end_endereco = cfg_endereco["start"], cfg_endereco["end"]
-        if cfg_bairro:
-            start_bairro, end_bairro = cfg_bairro["start"], cfg_bairro["end"]
-        if cfg_cep:
-            start_cep, end_cep = cfg_cep["start"], cfg_cep["end"]
-        if cfg_cidade:
-            start_cidade, end_cidade = cfg_cidade["start"], cfg_cidade["end"]
-        if cfg_uf:
-            start_uf, end_uf = cfg_uf["start"], cfg_uf["end"]
+    # Campos do sacado (Segmento Q), lidos todos de uma vez por um itemgetter
+    # de fatias; campo ausente no layout vira a fatia vazia (resulta em "")
+    campos_q = campos_q or {}
+    ler_sacado = itemgetter(*(
+        slice(cfg["start"], cfg["end"]) if cfg else slice(0, 0)
+        for cfg in map(campos_q.get, _CAMPOS_SACADO_Q)
+    ))
 
     total_linhas = len(linhas)
+    tamanho_minimo = max(end_nosso, end_venc, end_valor, 14)
 
-    for idx, linha in enumerate(linhas):
-        if not linha or linha.strip() == "":
-            continue
-        linha = linha.rstrip("\r\n")
-        if len(linha) < max(end_nosso, end_venc, end_valor, 14):
-            continue
+    if indices_p is None:
+        indices_p = indexar_segmentos_p_cnab240(linhas)
 
-        tipo_registro = linha[7:8]
-        segmento = linha[13:14].upper()
-
-        if tipo_registro != "3" or segmento != "P":
+    for idx in indices_p:
+        linha = linhas[idx].rstrip("\r\n")
+        if len(linha) < tamanho_minimo:
             continue
 
         lote = linha[3:7]
@@ -932,18 +1200,7 @@ def listar_titulos_cnab240(codigo_banco: str, linhas):
         nosso_numero = linha[start_nosso:end_nosso].strip()
 
         # Data de vencimento
-        data_raw = linha[start_venc:end_venc].strip()
-        data_vencimento_str = None
-        if len(data_raw) == 8 and data_raw.isdigit():
-            dia = int(data_raw[0:2])
-            mes = int(data_raw[2:4])
-            ano = int(data_raw[4:8])
-            try:
-                if 1 <= dia <= 31 and 1 <= mes <= 12 and 1900 <= ano <= 2099:
-                    dt = datetime(ano, mes, dia)
-                    data_vencimento_str = dt.strftime("%d/%m/%Y")
-            except ValueError:
-                data_vencimento_str = None
+        data_vencimento_str = _formatar_data_ddmmaaaa(linha[start_venc:end_venc].strip())
 
         # Valor
         valor_raw = linha[start_valor:end_valor].strip()
@@ -996,15 +1253,8 @@ def listar_titulos_cnab240(codigo_banco: str, linhas):
 
                 if cod2:
                     desc2_codigo = cod2
-                if len(data2_raw) == 8 and data2_raw.isdigit():
-                    dia2 = int(data2_raw[0:2])
-                    mes2 = int(data2_raw[2:4])
-                    ano2 = int(data2_raw[4:8])
-                    try:
-                        dt2 = datetime(ano2, mes2, dia2)
-                        desc2_data_str = dt2.strftime("%d/%m/%Y")
-                    except ValueError:
-                        desc2_data_str = None
+                # Datas do Segmento R não têm conferência de faixa, só de existência
+                desc2_data_str = _formatar_data_ddmmaaaa(data2_raw, faixa=False)
                 if valor2_raw.isdigit():
                     desc2_valor_reais = int(valor2_raw) / 100.0
 
@@ -1015,15 +1265,7 @@ def listar_titulos_cnab240(codigo_banco: str, linhas):
 
                 if cod3:
                     desc3_codigo = cod3
-                if len(data3_raw) == 8 and data3_raw.isdigit():
-                    dia3 = int(data3_raw[0:2])
-                    mes3 = int(data3_raw[2:4])
-                    ano3 = int(data3_raw[4:8])
-                    try:
-                        dt3 = datetime(ano3, mes3, dia3)
-                        desc3_data_str = dt3.strftime("%d/%m/%Y")
-                    except ValueError:
-                        desc3_data_str = None
+                desc3_data_str = _formatar_data_ddmmaaaa(data3_raw, faixa=False)
                 if valor3_raw.isdigit():
                     desc3_valor_reais = int(valor3_raw) / 100.0
 
@@ -1034,15 +1276,7 @@ def listar_titulos_cnab240(codigo_banco: str, linhas):
 
                 if codm:
                     multa_codigo = codm
-                if len(datam_raw) == 8 and datam_raw.isdigit():
-                    diam = int(datam_raw[0:2])
-                    mesm = int(datam_raw[2:4])
-                    anom = int(datam_raw[4:8])
-                    try:
-                        dtm = datetime(anom, mesm, diam)
-                        multa_data_str = dtm.strftime("%d/%m/%Y")
-                    except ValueError:
-                        multa_data_str = None
+                multa_data_str = _formatar_data_ddmmaaaa(datam_raw, faixa=False)
                 if valorm_raw.isdigit():
                     multa_valor_reais = int(valorm_raw) / 100.0
 
@@ -1060,35 +1294,11 @@ def listar_titulos_cnab240(codigo_banco: str, linhas):
                 lote_prox = prox[3:7]
 
                 if tipo_reg_prox == "3" and segmento_prox == "Q" and lote_prox == lote:
-
-                    # Documento
-                    if start_doc_sacado is not None:
-                        raw = prox[start_doc_sacado:end_doc_sacado]
-                        sacado_documento = limpar_numero(raw.strip())
-
-                    # Nome
-                    if start_nome_sacado is not None:
-                        sacado_nome = prox[start_nome_sacado:end_nome_sacado].strip()
-
-                    # Endereço
-                    if start_endereco is not None:
-                        sacado_endereco = prox[start_endereco:end_endereco].strip()
-
-                    # Bairro
-                    if start_bairro is not None:
-                        sacado_bairro = prox[start_bairro:end_bairro].strip()
-
-                    # CEP
-                    if start_cep is not None:
-                        sacado_cep = prox[start_cep:end_cep].strip()
-
-                    # Cidade
-                    if start_cidade is not None:
-                        sacado_cidade = prox[start_cidade:end_cidade].strip()
-
-                    # UF
-                    if start_uf is not None:
-                        sacado_uf = prox[start_uf:end_uf].strip()
+                    (
+                        sacado_documento, sacado_nome, sacado_endereco, sacado_bairro,
+                        sacado_cep, sacado_cidade, sacado_uf,
+                    ) = map(str.strip, ler_sacado(prox))
+                    sacado_documento = limpar_numero(sacado_documento)
 
         titulos.append(
             {
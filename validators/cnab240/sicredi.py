@@ -92,7 +92,7 @@ def validar_cnab240_sicredi(linhas):
                             erros_segmentos.append(
                                 f"Linha {numero_linha} (Segmento P): valor do título deve conter somente dígitos."
                             )
-                        elif int(valor_raw) == 0:
+                        elif not valor_raw.strip("0"):
                             erros_segmentos.append(
                                 f"Linha {numero_linha} (Segmento P): valor do título não pode ser zero."
                             )
@@ -67,6 +67,24 @@ from .banestes import (
     validar_cnab400_banestes
 )
 
+# Validador CNAB 400 por código de banco; bancos não mapeados caem no validador do BB
+VALIDADORES_CNAB400 = {
+    "341": validar_cnab400_itau,
+    "748": validar_cnab400_sicredi,
+    "104": validar_cnab400_caixa,
+    "237": validar_cnab400_bradesco,
+    "033": validar_cnab400_santander,
+    "070": validar_cnab400_brb,
+    "021": validar_cnab400_banestes,
+}
+
+def selecionar_validador_cnab400(codigo_banco):
+    """
+    Validador CNAB 400 do banco informado (código de 3 dígitos).
+    Bancos não mapeados em VALIDADORES_CNAB400 usam o validador do BB.
+    """
+    return VALIDADORES_CNAB400.get(codigo_banco, validar_cnab400_bb)
+
 __all__ = [
     "CNAB400_BB_CARTEIRAS_VALIDAS",
     "CNAB400_BB_TIPOS_COBRANCA",
@@ -106,5 +124,7 @@ __all__ = [
     "validar_cnab400_caixa",
     "validar_cnab400_bradesco",
     "validar_cnab400_santander",
-    "validar_cnab400_banestes"
+    "validar_cnab400_banestes",
+    "VALIDADORES_CNAB400",
+    "selecionar_validador_cnab400"
 ]
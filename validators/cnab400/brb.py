@@ -1,6 +1,8 @@
 """Validações específicas do CNAB 400 do Banco de Brasília (BRB) – versão 075."""
 
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
 
 from ..base import BANCOS_CNAB, ESTADOS_BR, limpar_numero
 from .utils import _campo_cnab400, _formatar_data_br, _parse_valor_cnab400
@@ -10,6 +12,7 @@ INSTRUCOES_PERMITIDAS = {
 }
 
 
+@lru_cache(maxsize=4096)
 def _parse_data_ddmmaaaa(valor: str):
     valor = (valor or "").strip()
     if len(valor) != 8 or not valor.isdigit():
@@ -98,7 +101,7 @@ def validar_cnab400_brb(linhas):
     }
 
     # Registros de detalhe (não há trailer)
-    for numero_linha, linha in enumerate(linhas[1:], start=2):
+    for numero_linha, linha in enumerate(islice(linhas, 1, None), start=2):
         if not linha or linha.strip() == "":
             continue
         registro = linha.rstrip("\r\n")
@@ -1,6 +1,7 @@
 """Funções utilitárias compartilhadas entre validadores CNAB 400."""
 
 from datetime import datetime
+from functools import lru_cache
 
 def _campo_cnab400(linha: str, pos_inicio: int, pos_fim: int) -> str:
     """
@@ -13,6 +14,7 @@ def _campo_cnab400(linha: str, pos_inicio: int, pos_fim: int) -> str:
     fim = min(pos_fim, len(linha))
     return linha[pos_inicio - 1:fim]
 
+@lru_cache(maxsize=4096)
 def _parse_data_cnab400(valor: str):
     valor = (valor or "").strip()
     if not valor or valor == "000000" or len(valor) != 6 or not valor.isdigit():